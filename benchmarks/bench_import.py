@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+
+#benchmark of the time to import imfpy in a fresh interpreter
+import subprocess, sys
+import pytest
+
+SCRIPTS = {'interpreter': 'pass',
+           'imfpy': 'import imfpy, imfpy.searches, imfpy.retrievals, imfpy.tools'}
+''' Code run in each fresh interpreter: the bare interpreter start is the baseline to subtract from the imports '''
+
+@pytest.mark.parametrize('name', list(SCRIPTS))
+def test_import(benchmark, name):
+    """ Starting a fresh interpreter, and importing imfpy and its searches, retrievals and tools modules in one """
+    benchmark.pedantic(subprocess.run, args=([sys.executable, '-c', SCRIPTS[name]],), kwargs={'check': True},
+                       rounds=10, iterations=1)
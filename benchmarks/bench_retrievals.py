@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+#benchmarks of retrievals.dots, split into its network-free stages
+import pytest
+from conftest import COUNTRY, COUNTERPARTS, DOTS_CASES, Preloaded
+from imfpy import fixtures, retrievals, sdmx, transport
+
+class _Logged(Preloaded):
+
+    """ Preloaded transport keeping the URLs requested """
+
+    def get(self, url, stream=False):
+        self.urls.append(url)
+        return super().get(url, stream)
+
+def _urls(recorded, counterparts, start, end, freq):
+
+    #the requests dots sends for a case
+    logged = _Logged(recorded)
+    logged.urls = []
+    with fixtures._using(logged):
+        retrievals.dots(COUNTRY, counterparts, start, end, freq, cache=False)
+    return logged.urls
+
+def _bodies(recorded, *case):
+
+    #the recorded bodies of the requests dots sends for a case
+    return [recorded.load(recorded.key(url)) for url in _urls(recorded, *case)]
+
+@pytest.mark.parametrize('case', DOTS_CASES)
+def test_dots(benchmark, case):
+    """ Whole dots calls answered from memory: request planning, parsing and frame building """
+    benchmark(retrievals.dots, COUNTRY, *DOTS_CASES[case], cache=False)
+
+@pytest.mark.parametrize('case', DOTS_CASES)
+def test_dots_parse(benchmark, recorded, case):
+    """ Decoding the response bodies with the JSON backend, then the observations of their series """
+    bodies = _bodies(recorded, *DOTS_CASES[case])
+    benchmark.extra_info['bytes'] = sum(len(body) for body in bodies)
+
+    def parse():
+        return [sdmx.decode_obs(series.get('Obs'))
+                for body in bodies for series in sdmx.walk(transport.loads(body), 'CompactData.DataSet.Series')]
+
+    benchmark(parse)
+
+@pytest.mark.parametrize('stream', [False, True], ids=['whole', 'stream'])
+@pytest.mark.parametrize('case', DOTS_CASES)
+def test_iter_items(benchmark, recorded, case, stream):
+    """ Transport.iter_items over the responses of a case, decoded whole with the JSON backend or streamed with ijson """
+    if stream:
+        pytest.importorskip('ijson')
+    urls = _urls(recorded, *DOTS_CASES[case])
+    preloaded = Preloaded(recorded, stream=stream)
+    benchmark.extra_info['backend'] = 'ijson' if stream else transport.json_backend()
+    benchmark(lambda: [series for url in urls for series in preloaded.iter_items(url, 'CompactData.DataSet.Series')])
+
+@pytest.mark.parametrize('case', DOTS_CASES)
+def test_dots_build(benchmark, case):
+    """ Building the returned frame from series kept in memory by an earlier call, without parsing """
+    retrievals.clear_cache()
+    retrievals.dots(COUNTRY, *DOTS_CASES[case])
+    benchmark(retrievals.dots, COUNTRY, *DOTS_CASES[case])
+    retrievals.clear_cache()
+
+@pytest.mark.parametrize('count', [10, 100])
+def test_pivot(benchmark, count):
+    """ Pivoting long-form dots data to wide form """
+    long_df = retrievals.dots(COUNTRY, COUNTERPARTS[:count], 2000, 2020, 'M', 'long', cache=False)
+    benchmark(retrievals._to_wide, long_df.drop(columns='Country'), COUNTRY)
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+#benchmarks of the keyword searches and the parsing of data structures
+import pytest
+from imfpy import searches
+
+KEYWORDS = ['united', 'kingdom', 'rep. of', 'islands', 'china', 'korea', 'guinea', 'ireland', 'arab', 'the',
+            'france', 'côte', 'bahamas', 'new', 'south', 'stan', 'land', 'ia', 'x', 'nowhere']
+''' Keywords searched per round, so rounds measure throughput over a mix of common, rare and missing keywords '''
+PATTERNS = [r'^[A-C]', r'Rep\.( of)?$', r'(?i)island', r', The$', r'^(United|New) ']
+''' Regular expressions searched per round '''
+DATABASE_KEYWORDS = ['trade', 'financial', 'statistics', 'balance of payments', 'prices', 'outlook', 'government', 'missing']
+''' Database keywords searched per round '''
+
+@pytest.fixture(scope='module', autouse=True)
+def codes():
+    #fill the code caches before timing, the searches themselves never send requests
+    searches.country_codes()
+    searches.database_codes()
+
+def test_country_search(benchmark):
+    """ country_search over KEYWORDS """
+    benchmark.extra_info['keywords'] = len(KEYWORDS)
+    benchmark(lambda: [searches.country_search(keyword) for keyword in KEYWORDS])
+
+def test_country_search_regex(benchmark):
+    """ country_search over PATTERNS """
+    benchmark.extra_info['keywords'] = len(PATTERNS)
+    benchmark(lambda: [searches.country_search(pattern, regex=True) for pattern in PATTERNS])
+
+def test_country_search_many(benchmark):
+    """ country_search_many over KEYWORDS at once """
+    benchmark.extra_info['keywords'] = len(KEYWORDS)
+    benchmark(searches.country_search_many, KEYWORDS)
+
+def test_database_search(benchmark):
+    """ database_search over DATABASE_KEYWORDS """
+    benchmark.extra_info['keywords'] = len(DATABASE_KEYWORDS)
+    benchmark(lambda: [searches.database_search(keyword) for keyword in DATABASE_KEYWORDS])
+
+def test_database_dimensions(benchmark):
+    """ database_dimensions with the data structure parsed again each round """
+    benchmark.pedantic(searches.database_dimensions, args=('DOT',), setup=searches._structure_cache.clear,
+                       rounds=50, warmup_rounds=1)
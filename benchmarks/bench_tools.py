@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+
+#benchmarks of plotting with tools.dotsplot, drawn off-screen
+import pytest
+from conftest import COUNTRY, COUNTERPARTS, PLOT_COUNTERPARTS
+from imfpy import retrievals, tools
+
+@pytest.fixture(scope='module')
+def plt():
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib import pyplot
+    pyplot.rcParams['figure.max_open_warning'] = 0
+    return pyplot
+
+@pytest.mark.parametrize('count', PLOT_COUNTERPARTS)
+def test_dotsplot(benchmark, plt, count):
+    """ dotsplot of monthly long-form data, including drawing every figure it creates """
+    long_df = retrievals.dots(COUNTRY, COUNTERPARTS[:count] if count > 1 else COUNTERPARTS[0], 2000, 2020, 'M', 'long', cache=False)
+
+    def render():
+        tools.dotsplot(long_df.copy())
+        for number in plt.get_fignums():
+            plt.figure(number).canvas.draw()
+        plt.close('all')
+
+    benchmark.pedantic(render, rounds=max(2, 30 // count), warmup_rounds=1)
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+#shared setup of the benchmark suite: every request is answered in memory from recorded payloads
+import os, sys
+import pytest
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import payloads
+from imfpy import fixtures, retrievals, searches, snapshot, transport
+
+COUNTRY = payloads.COUNTRIES[0][0]
+''' Home country of every dots benchmark '''
+COUNTERPARTS = [code for code, _ in payloads.COUNTRIES[1:]]
+''' Counterparts of the dots and dotsplot benchmarks, the first n are used for n counterparts '''
+DOTS_CASES = {'single-annual': (COUNTERPARTS[0], 1980, 2020, 'A'),
+              'single-monthly': (COUNTERPARTS[0], 1980, 2020, 'M'),
+              'multi-annual': (COUNTERPARTS[:40], 1980, 2020, 'A'),
+              'multi-monthly': (COUNTERPARTS[:40], 1980, 2020, 'M')}
+''' dots requests benchmarked, by name: (counterparts, start, end, freq) '''
+PLOT_COUNTERPARTS = [1, 10, 100]
+''' Numbers of counterparts plotted by the dotsplot benchmarks '''
+
+def pytest_addoption(parser):
+    group = parser.getgroup('imfpy')
+    group.addoption('--payloads', default=None,
+                    help='directory of fixtures recorded with imfpy.fixtures to replay (default: generated payloads)')
+    group.addoption('--record', action='store_true',
+                    help='record the payloads from the IMF API into --payloads before benchmarking')
+
+def workload():
+
+    """ Sends every request the benchmarks replay, so they can be recorded """
+
+    searches.country_codes()
+    searches.database_codes()
+    searches.data_structure('DOT')
+    for counterparts, start, end, freq in DOTS_CASES.values():
+        retrievals.dots(COUNTRY, counterparts, start, end, freq, cache=False)
+    for count in PLOT_COUNTERPARTS:
+        retrievals.dots(COUNTRY, COUNTERPARTS[:count] if count > 1 else COUNTERPARTS[0], 2000, 2020, 'M', 'long', cache=False)
+
+class _Generated(fixtures.RecordingTransport, payloads.Upstream):
+    pass
+
+class Preloaded(transport.Transport):
+
+    """ A Transport answering from fixtures decompressed into memory up front, so no benchmark touches the disk or network """
+
+    def __init__(self, store, **kwargs):
+        kwargs.setdefault('limiter', transport.RateLimiter(rate=1e9, burst=10**9, max_rate=1e9))
+        super().__init__(**kwargs)
+        self.bodies = {key: store.load(key) for key in store.keys()}
+
+    def get(self, url, stream=False):
+        content = self.bodies.get(fixtures.FixtureStore.key(url))
+        assert content is not None, f"No recorded response for {url}"
+        return fixtures.Replayed(url, content)
+
+@pytest.fixture(scope='session', autouse=True)
+def recorded(request, tmp_path_factory):
+
+    """ Records (or reuses) the payloads, then answers every request of the session from them in memory """
+
+    path, record = request.config.getoption('--payloads'), request.config.getoption('--record')
+    enabled = snapshot._enabled
+    snapshot.disable()
+    if path is None or record:
+        path = path or str(tmp_path_factory.mktemp('payloads'))
+        recorder = fixtures.RecordingTransport(path) if record else _Generated(path)
+        with fixtures._using(recorder):
+            workload()
+
+    store = fixtures.FixtureStore(path)
+    with fixtures._using(Preloaded(store)):
+        searches.clear_cache()
+        retrievals.clear_cache()
+        yield store
+    searches.clear_cache()
+    retrievals.clear_cache()
+    if enabled:
+        snapshot.enable()
+
+def pytest_benchmark_update_json(config, benchmarks, output_json):
+
+    #label saved results with what was measured, so runs can be compared between releases
+    import imfpy
+    output_json['imfpy'] = {'version': imfpy.__version__, 'json_backend': transport.json_backend(),
+                            'payloads': config.getoption('--payloads') or 'generated'}
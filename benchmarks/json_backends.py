@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compares the JSON backends available to imfpy.transport on CompactData and DataStructure payloads.
+
+Usage: python benchmarks/json_backends.py [payload.json ...]
+Recorded responses can be passed as files, otherwise representative payloads are generated.
+"""
+
+import os, sys, timeit
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from imfpy import transport
+from payloads import compact_data, data_structure
+
+def main(files):
+    if files:
+        payloads = {os.path.basename(file): open(file, 'rb').read() for file in files}
+    else:
+        payloads = {'CompactData (40 partners, monthly)': compact_data(),
+                    'CompactData (1 partner, annual)': compact_data(counterparts=1, periods=40, freq='A'),
+                    'DataStructure (6 codelists)': data_structure()}
+    
+    for name, payload in payloads.items():
+        print(f'{name}: {len(payload)/1e6:.2f} MB')
+        timings = {}
+        for backend in transport.JSON_BACKENDS:
+            try:
+                transport.set_json_backend(backend)
+            except AssertionError:
+                continue
+            number = max(1, int(2e7 // len(payload)))
+            timings[backend] = min(timeit.repeat(lambda: transport.loads(payload), number=number, repeat=5)) / number
+        for backend, seconds in timings.items():
+            print(f'    {backend:8} {seconds*1e3:9.2f} ms  {timings["json"]/seconds:5.2f}x')
+        transport.set_json_backend()
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+#representative SDMX JSON payloads for benchmarks, shaped like the responses of the IMF API
+import json, random
+from urllib.parse import urlparse, parse_qs
+from imfpy import fixtures, transport
+
+SERIES = ['TXG_FOB_USD', 'TMG_CIF_USD', 'TBG_USD']
+COUNTRIES = [
+    ('US', 'United States'), ('AE', 'United Arab Emirates'), ('AR', 'Argentina'), ('AT', 'Austria'), ('AU', 'Australia'),
+    ('BD', 'Bangladesh'), ('BE', 'Belgium'), ('BG', 'Bulgaria'), ('BH', 'Bahrain, Kingdom of'), ('BR', 'Brazil'),
+    ('BS', 'Bahamas, The'), ('BY', 'Belarus, Rep. of'), ('CA', 'Canada'), ('CH', 'Switzerland'), ('CI', "Côte d'Ivoire"),
+    ('CL', 'Chile'), ('CM', 'Cameroon'), ('CN', 'China, P.R.: Mainland'), ('CO', 'Colombia'), ('CR', 'Costa Rica'),
+    ('CY', 'Cyprus'), ('CZ', 'Czech Rep.'), ('DE', 'Germany'), ('DK', 'Denmark'), ('DO', 'Dominican Rep.'),
+    ('DZ', 'Algeria'), ('EC', 'Ecuador'), ('EE', 'Estonia, Rep. of'), ('EG', 'Egypt, Arab Rep. of'), ('ES', 'Spain'),
+    ('ET', 'Ethiopia, The Federal Dem. Rep. of'), ('FI', 'Finland'), ('FR', 'France'), ('GB', 'United Kingdom'), ('GH', 'Ghana'),
+    ('GR', 'Greece'), ('GT', 'Guatemala'), ('HK', 'China, P.R.: Hong Kong'), ('HN', 'Honduras'), ('HR', 'Croatia, Rep. of'),
+    ('HU', 'Hungary'), ('ID', 'Indonesia'), ('IE', 'Ireland'), ('IL', 'Israel'), ('IN', 'India'),
+    ('IQ', 'Iraq'), ('IR', 'Iran, Islamic Rep. of'), ('IS', 'Iceland'), ('IT', 'Italy'), ('JM', 'Jamaica'),
+    ('JO', 'Jordan'), ('JP', 'Japan'), ('KE', 'Kenya'), ('KH', 'Cambodia'), ('KR', 'Korea, Rep. of'),
+    ('KW', 'Kuwait'), ('KZ', 'Kazakhstan, Rep. of'), ('LB', 'Lebanon'), ('LK', 'Sri Lanka'), ('LT', 'Lithuania'),
+    ('LU', 'Luxembourg'), ('LV', 'Latvia'), ('MA', 'Morocco'), ('MM', 'Myanmar'), ('MN', 'Mongolia'),
+    ('MO', 'China, P.R.: Macao'), ('MT', 'Malta'), ('MU', 'Mauritius'), ('MX', 'Mexico'), ('MY', 'Malaysia'),
+    ('NG', 'Nigeria'), ('NL', 'Netherlands, The'), ('NO', 'Norway'), ('NP', 'Nepal'), ('NZ', 'New Zealand'),
+    ('OM', 'Oman'), ('PA', 'Panama'), ('PE', 'Peru'), ('PH', 'Philippines'), ('PK', 'Pakistan'),
+    ('PL', 'Poland, Rep. of'), ('PT', 'Portugal'), ('PY', 'Paraguay'), ('QA', 'Qatar'), ('RO', 'Romania'),
+    ('RS', 'Serbia, Rep. of'), ('RU', 'Russian Federation'), ('SA', 'Saudi Arabia'), ('SE', 'Sweden'), ('SG', 'Singapore'),
+    ('SI', 'Slovenia, Rep. of'), ('SK', 'Slovak Rep.'), ('SN', 'Senegal'), ('TH', 'Thailand'), ('TN', 'Tunisia'),
+    ('TR', 'Türkiye, Rep. of'), ('TZ', 'Tanzania, United Rep. of'), ('UA', 'Ukraine'), ('UY', 'Uruguay'), ('VN', 'Vietnam'),
+    ('ZA', 'South Africa')]
+''' Country codes and names (the home country first, then 100 counterparts) used by the generated payloads and the benchmarks '''
+
+def compact_data(counterparts=40, periods=480, freq='M', seed=0, country='US', start=(1980, 1)):
+    
+    """
+    Returns the body (bytes) of a DOT CompactData response
+    for one country against a number of counterparts (or a list of counterpart codes), with all three trade series
+    starting from a (year, month).
+    """
+    
+    rng = random.Random(seed)
+    first = start[0]*12 + start[1] - 1
+    if freq == 'M':
+        times = [f'{(first + i)//12}-{(first + i)%12 + 1:02d}' for i in range(periods)]
+    else:
+        times = [str(start[0] + i) for i in range(periods)]
+    if isinstance(counterparts, int):
+        counterparts = [f'C{c:03d}' for c in range(counterparts)]
+    series = []
+    for counterpart in counterparts:
+        for indicator in SERIES:
+            series.append({'@FREQ': freq, '@REF_AREA': country, '@INDICATOR': indicator,
+                           '@COUNTERPART_AREA': counterpart, '@UNIT_MULT': '6', '@TIME_FORMAT': 'P1M',
+                           'Obs': [{'@TIME_PERIOD': t, '@OBS_VALUE': f'{rng.uniform(-1e5, 1e5):.4f}'} for t in times]})
+    return json.dumps({'CompactData': {'@xmlns:xsi': 'http://www.w3.org/2001/XMLSchema-instance',
+                                       'Header': {'ID': '1', 'Test': 'false'},
+                                       'DataSet': {'@xmlns': 'http://dataservices.imf.org/compact/DOT', 'Series': series}}}).encode()
+
+def data_structure(codes=250, codelists=6, seed=0, areas=None):
+    
+    """
+    Returns the body (bytes) of a DataStructure response with a number of codelists,
+    annotations and dimensions. A list of (code, name) areas adds REF_AREA and COUNTERPART_AREA dimensions.
+    """
+    
+    rng = random.Random(seed)
+    words = ['Trade', 'Goods', 'Exports', 'Imports', 'Balance', 'Value', 'US Dollars', 'Republic', 'Kingdom', 'Islands']
+    def codelist(i):
+        return {'@agencyID': 'IMF', '@id': f'CL_LIST_{i}', '@version': '1.0',
+                'Name': {'@xml:lang': 'en', '#text': f'Codelist {i}'},
+                'Code': [{'@value': f'X{i}_{c}', 'Description': {'@xml:lang': 'en', '#text': ' '.join(rng.sample(words, 3))}}
+                         for c in range(codes)]}
+    dimensions = [{'@conceptRef': f'DIM_{i}', '@conceptVersion': '1.0', '@conceptSchemeRef': 'CS_DOT',
+                   '@conceptAgency': 'IMF', '@codelist': f'CL_LIST_{i}', '@codelistVersion': '1.0', '@codelistAgency': 'IMF'}
+                  for i in range(4)]
+    codelists = [codelist(i) for i in range(codelists)]
+    if areas is not None:
+        codelists.append({'@agencyID': 'IMF', '@id': 'CL_AREA', '@version': '1.0', 'Name': {'@xml:lang': 'en', '#text': 'Area'},
+                          'Code': [{'@value': code, 'Description': {'@xml:lang': 'en', '#text': name}} for code, name in areas]})
+        dimensions += [{'@conceptRef': concept, '@conceptVersion': '1.0', '@conceptSchemeRef': 'CS_DOT', '@conceptAgency': 'IMF',
+                        '@codelist': 'CL_AREA', '@codelistVersion': '1.0', '@codelistAgency': 'IMF'}
+                       for concept in ('REF_AREA', 'COUNTERPART_AREA')]
+    annotations = [{'AnnotationTitle': f'Annotation {i}', 'AnnotationText': {'@xml:lang': 'en', '#text': '<p>' + ' '.join(words) + '</p>'}}
+                   for i in range(8)]
+    return json.dumps({'Structure': {'CodeLists': {'CodeList': codelists},
+                                     'KeyFamilies': {'KeyFamily': {'@id': 'DOT', 'Annotations': {'Annotation': annotations},
+                                                                   'Components': {'Dimension': dimensions}}}}}).encode()
+
+def areas(count=250, seed=0):
+    
+    """ Returns (code, name) pairs of COUNTRIES followed by generated areas, count in all """
+    
+    rng = random.Random(seed)
+    syllables = ['ba', 'ko', 'ri', 'sta', 'na', 'mo', 'gua', 'le', 'tu', 'vi', 'zan', 'dor']
+    extra = [(f'X{i:03d}', ' '.join([''.join(rng.sample(syllables, 3)).title(), rng.choice(['', 'Islands', 'Rep. of', 'The'])]).strip())
+             for i in range(count - len(COUNTRIES))]
+    return COUNTRIES[:count] + extra
+
+def dataflow(databases=260, seed=0):
+    
+    """ Returns the body (bytes) of a Dataflow response listing a number of databases """
+    
+    rng = random.Random(seed)
+    words = ['Trade', 'Direction of', 'Statistics', 'Balance of Payments', 'Financial', 'Soundness', 'Indicators',
+             'Government', 'Finance', 'International', 'Reserves', 'Commodity', 'Prices', 'Regional', 'Outlook']
+    dataflows = [{'@id': f'DS-{"DOT" if i == 0 else f"DB{i:03d}"}', '@version': '1.0', '@agencyID': 'IMF',
+                  'Name': {'@xml:lang': 'en', '#text': ' '.join(rng.sample(words, 4))},
+                  'KeyFamilyRef': {'KeyFamilyID': 'DOT' if i == 0 else f'DB{i:03d}', 'KeyFamilyAgencyID': 'IMF'}}
+                 for i in range(databases)]
+    return json.dumps({'Structure': {'Dataflows': {'Dataflow': dataflows}}}).encode()
+
+def _bound(period, is_end):
+    
+    #(year, month) of a startPeriod/endPeriod parameter such as '1980' or '1980.05'
+    year, _, month = period.replace('-', '.').partition('.')
+    return int(year), int(month) if month else (12 if is_end else 1)
+
+class Upstream(transport.Transport):
+    
+    """
+    A Transport answering Dataflow, DataStructure and DOT CompactData requests with generated payloads
+    instead of sending them to the IMF API, so fixtures can be recorded from it without the network.
+    """
+    
+    def get(self, url, stream=False):
+        key = fixtures.FixtureStore.key(url)
+        if key == 'Dataflow':
+            body = dataflow()
+        elif key.startswith('DataStructure/'):
+            body = data_structure(areas=areas())
+        else:
+            query = urlparse(url)
+            freq, country, _, counterparts = query.path.split('/CompactData/DOT/')[1].split('.')
+            params = parse_qs(query.query)
+            start, end = _bound(params['startPeriod'][0], False), _bound(params['endPeriod'][0], True)
+            periods = end[0] - start[0] + 1 if freq == 'A' else (end[0] - start[0])*12 + end[1] - start[1] + 1
+            body = compact_data(counterparts.split('+'), periods, freq, country=country, start=start)
+        return fixtures.Replayed(url, body)
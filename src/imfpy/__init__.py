@@ -1,8 +1,21 @@
-# read version from installed package
-try:
-    from importlib.metadata import version
-except Exception:
-    from importlib_metadata import version
-__version__ = version("imfpy")
-##
+# read version from installed package, and import submodules, only when first used
+#so that `import imfpy` stays fast (see tests/test_imfpy.py::test_import_time)
+import importlib
+
+_SUBMODULES = ['aio', 'cache', 'catalog', 'events', 'fixtures', 'matching', 'profiling', 'retrievals', 'sdmx', 'searches', 'server', 'snapshot', 'store', 'tools', 'transport']
 
+def __getattr__(name):
+    if name == '__version__':
+        try:
+            from importlib.metadata import version
+        except Exception:
+            from importlib_metadata import version
+        globals()['__version__'] = version("imfpy")
+        return globals()['__version__']
+    if name in _SUBMODULES:
+        return importlib.import_module(f'{__name__}.{name}')
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(list(globals()) + ['__version__'] + _SUBMODULES)
+##
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+#shared machinery behind the awaitable (a-prefixed) functions in retrievals and searches
+import asyncio, functools, threading, weakref
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_CONCURRENCY = 100
+''' Maximum number of IMF queries in flight at once across the awaitable functions '''
+
+_executor = None
+_semaphores = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+def set_concurrency(limit):
+    
+    """
+    Sets the maximum number of IMF queries the awaitable functions keep in flight.
+    Takes effect for event loops and worker threads created after the call.
+    
+    Parameters
+    ----------
+    limit : int
+        The maximum number of concurrent queries.
+    
+    Examples
+    --------
+    >>> aio.set_concurrency(20)
+    Allows at most 20 queries in flight at once.
+    
+    """
+    
+    assert isinstance(limit, int) and limit > 0, "limit must be a positive int"
+    
+    global MAX_CONCURRENCY, _executor
+    
+    with _lock:
+        MAX_CONCURRENCY = limit
+        old, _executor = _executor, None
+        _semaphores.clear()
+    if old is not None:
+        old.shutdown(wait=False)
+
+def _get_executor():
+    
+    """ Returns the shared worker pool, creating it on first use """
+    
+    global _executor
+    
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY, thread_name_prefix="imfpy")
+        return _executor
+
+def _get_semaphore(loop):
+    
+    """ Returns the semaphore bounding queries in flight on a given event loop """
+    
+    with _lock:
+        semaphore = _semaphores.get(loop)
+        if semaphore is None:
+            semaphore = _semaphores[loop] = asyncio.Semaphore(MAX_CONCURRENCY)
+        return semaphore
+
+async def run(func, *args, **kwargs):
+    
+    """
+    Awaits a blocking imfpy function without blocking the event loop.
+    The call runs on the shared worker pool once a slot on the semaphore is free.
+    
+    Parameters
+    ----------
+    func : callable
+        The blocking function, such as retrievals.dots.
+    *args, **kwargs
+        Arguments passed on to func.
+        
+    Returns
+    -------
+    The return value of func.
+    
+    Examples
+    --------
+    >>> await aio.run(retrievals.dots, 'US', 'CN', 1995, 2020)
+    Same as awaiting retrievals.adots('US', 'CN', 1995, 2020)
+    
+    """
+    
+    import contextvars
+    
+    #run in a copy of the task's context, so callbacks listening in it (see events.listen) receive the call's events
+    loop = asyncio.get_running_loop()
+    async with _get_semaphore(loop):
+        return await loop.run_in_executor(_get_executor(), functools.partial(contextvars.copy_context().run, func, *args, **kwargs))
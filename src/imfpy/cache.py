@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+
+#persistent on-disk cache of raw API responses, keyed by the full request URL
+import hashlib, json, os, threading, time, zlib
+
+TTLS = {'CompactData': 24*60*60,
+        'DataStructure': 7*24*60*60,
+        'Dataflow': 7*24*60*60,
+        'CodeList': 7*24*60*60}
+''' Time to live (in seconds) of cached responses for each SDMX endpoint '''
+DEFAULT_TTL = 24*60*60
+''' Time to live (in seconds) of cached responses from any other endpoint '''
+MAX_SIZE = 512*1024*1024
+''' Default maximum size of the cache on disk (in bytes) '''
+
+_cache = None
+_lock = threading.Lock()
+
+def _file_size(file):
+    try:
+        return os.path.getsize(file)
+    except OSError:
+        return 0
+
+class DiskCache:
+    
+    """
+    A size-capped cache of API responses stored as compressed files in a directory.
+    Entries expire after the time to live of their SDMX endpoint,
+    and the least recently used entries are evicted once the cache exceeds max_size.
+    Entries that cannot be read back (such as files truncated by a crash) count as missing and are deleted.
+    
+    Parameters
+    ----------
+    path : str
+        Directory in which cached responses are stored. Created if it does not exist.
+    max_size : int (optional), default=MAX_SIZE
+        Maximum total size of the cached files (in bytes).
+    ttls : dict (optional), default=None
+        Time to live (in seconds) per endpoint, overriding the defaults in TTLS.
+    
+    """
+    
+    def __init__(self, path, max_size=MAX_SIZE, ttls=None):
+        assert isinstance(max_size, int) and max_size > 0, "max_size must be a positive int"
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.max_size = max_size
+        self.ttls = dict(TTLS, **(ttls or {}))
+        self._lock = threading.Lock()
+        #running total of the cached files, counted by the first eviction and kept up to date by this instance
+        self._size = None
+        os.makedirs(self.path, exist_ok=True)
+    
+    def ttl(self, url):
+        
+        """ Returns the time to live (in seconds) of a response from the endpoint in url """
+        
+        for endpoint, ttl in self.ttls.items():
+            if f'/{endpoint}' in url:
+                return ttl
+        return DEFAULT_TTL
+    
+    def _file(self, url):
+        return os.path.join(self.path, hashlib.sha256(url.encode('utf-8')).hexdigest() + '.gz')
+    
+    def get(self, url):
+        
+        """ Returns the cached response body (bytes) for url, or None if missing or expired """
+        
+        file = self._file(url)
+        try:
+            with open(file, 'rb') as f:
+                header, body = f.read().split(b'\n', 1)
+        except (OSError, ValueError):
+            return None
+        
+        #check the entry is not stale and is really for this url (not a hash collision)
+        try:
+            meta = json.loads(header)
+            fresh = meta['url'] == url and time.time() - meta['stored'] <= self.ttl(url)
+            content = zlib.decompress(body) if fresh else None
+        except (ValueError, KeyError, TypeError, zlib.error):
+            content = None
+        if content is None:
+            self.delete(url)
+            return None
+        
+        #mark the entry as recently used for LRU eviction
+        try:
+            os.utime(file)
+        except OSError:
+            pass
+        return content
+    
+    def set(self, url, content):
+        
+        """ Stores a response body (bytes) for url, evicting old entries if the cache is full """
+        
+        header = json.dumps({'url': url, 'stored': time.time()}).encode('utf-8')
+        file = self._file(url)
+        temp = f'{file}.{os.getpid()}.{threading.get_ident()}.tmp'
+        data = header + b'\n' + zlib.compress(content)
+        with open(temp, 'wb') as f:
+            f.write(data)
+        replaced = _file_size(file)
+        os.replace(temp, file)
+        
+        #only scan the directory once the running total goes over max_size
+        with self._lock:
+            if self._size is not None:
+                self._size += len(data) - replaced
+            full = self._size is None or self._size > self.max_size
+        if full:
+            self.evict()
+    
+    def delete(self, url):
+        
+        """ Removes the cached response for url, if any """
+        
+        file = self._file(url)
+        removed = _file_size(file)
+        try:
+            os.remove(file)
+        except OSError:
+            return
+        with self._lock:
+            if self._size is not None:
+                self._size = max(0, self._size - removed)
+    
+    def evict(self):
+        
+        """ Deletes least recently used entries until the cache fits within max_size """
+        
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.path):
+                if entry.name.endswith('.gz'):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            size = sum(entry[1] for entry in entries)
+            for mtime, file_size, file in sorted(entries):
+                if size <= self.max_size:
+                    break
+                try:
+                    os.remove(file)
+                except OSError:
+                    pass
+                size -= file_size
+            self._size = size
+    
+    def clear(self):
+        
+        """ Deletes every cached response """
+        
+        for entry in os.scandir(self.path):
+            if entry.name.endswith('.gz'):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+        with self._lock:
+            self._size = None
+    
+    def size(self):
+        
+        """ Returns the total size of the cached responses (in bytes) """
+        
+        return sum(entry.stat().st_size for entry in os.scandir(self.path) if entry.name.endswith('.gz'))
+
+def enable(path=None, max_size=MAX_SIZE, ttls=None):
+    
+    """
+    Turns on the on-disk response cache for every request sent by imfpy.
+    
+    Parameters
+    ----------
+    path : str (optional), default=None
+        Directory in which cached responses are stored.
+        Defaults to the IMFPY_CACHE_DIR environment variable, or ~/.cache/imfpy.
+    max_size : int (optional), default=MAX_SIZE
+        Maximum total size of the cached files (in bytes).
+    ttls : dict (optional), default=None
+        Time to live (in seconds) per endpoint, such as {'CompactData': 3600}.
+        
+    Returns
+    -------
+    cache : DiskCache
+        The cache now in use.
+    
+    Examples
+    --------
+    >>> cache.enable()
+    Caches responses in ~/.cache/imfpy
+    
+    >>> cache.enable('/tmp/imf', max_size=10**8, ttls={'CompactData': 3600})
+    Caches up to 100MB of responses in /tmp/imf, data responses expire after an hour.
+    
+    """
+    
+    global _cache
+    
+    if path is None:
+        path = os.environ.get('IMFPY_CACHE_DIR') or os.path.join('~', '.cache', 'imfpy')
+    with _lock:
+        _cache = DiskCache(path, max_size, ttls)
+    return _cache
+
+def disable():
+    
+    """ Turns off the on-disk response cache. Cached files are kept. """
+    
+    global _cache
+    
+    with _lock:
+        _cache = None
+
+def get_cache():
+    
+    """ Returns the DiskCache in use, or None if caching is turned off """
+    
+    return _cache
+
+#turn the cache on at import time only if asked to in the environment
+#(IMFPY_CACHE_DIR alone just chooses the directory, which the codelist snapshot also uses)
+if os.environ.get('IMFPY_RESPONSE_CACHE', '0') == '1':
+    enable()
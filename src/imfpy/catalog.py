@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+
+#local full-text catalog of IMF databases, dimensions and codelists for searching without the network
+import os, sqlite3, threading, time
+from contextlib import closing
+
+MAX_WORKERS = 8
+''' Default number of concurrent requests sent while crawling the API '''
+
+SCHEMA = '''
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE databases (database_id TEXT PRIMARY KEY, description TEXT);
+CREATE TABLE dimensions (database_id TEXT, position INTEGER, concept TEXT, scheme TEXT, codelist TEXT);
+CREATE TABLE codes (codelist TEXT, position INTEGER, code TEXT, description TEXT);
+CREATE INDEX dimensions_database ON dimensions (database_id);
+CREATE INDEX dimensions_codelist ON dimensions (codelist);
+CREATE INDEX codes_codelist ON codes (codelist);
+CREATE VIRTUAL TABLE entries USING fts5 (kind UNINDEXED, database_id UNINDEXED, codelist UNINDEXED, code, description,
+                                         tokenize="unicode61 remove_diacritics 2");
+'''
+''' Tables of the catalog, entries is the full-text index searched by Catalog.search '''
+
+_lock = threading.Lock()
+
+def default_path():
+
+    """ Returns the catalog path: the IMFPY_CATALOG environment variable, or ~/.cache/imfpy/catalog.sqlite """
+
+    path = os.environ.get('IMFPY_CATALOG') or os.path.join('~', '.cache', 'imfpy', 'catalog.sqlite')
+    return os.path.abspath(os.path.expanduser(path))
+
+def build(path=None, max_workers=MAX_WORKERS, databases=None):
+
+    """
+    Crawls the API and builds a local SQLite catalog of every database, its dimensions
+    and every codelist they use, with a full-text index over codes and descriptions.
+    DataStructure documents (which embed most codelists) are requested concurrently,
+    then any codelist they reference but do not embed is requested from CodeList.
+    The catalog is written to a temporary file and moved into place once complete.
+
+    Parameters
+    ----------
+    path : str (optional), default=None
+        File to write the catalog to. Defaults to default_path().
+    max_workers : int (optional), default=MAX_WORKERS
+        Maximum number of requests sent at the same time.
+    databases : list of str (optional), default=None
+        Database IDs to crawl. Defaults to all databases (see searches.database_codes).
+
+    Returns
+    -------
+    summary : dict
+        The catalog path, the number of databases, codelists and codes stored,
+        and the IDs of databases or codelists that could not be retrieved.
+
+    Examples
+    --------
+    >>> catalog.build()
+    Crawls every IMF database into ~/.cache/imfpy/catalog.sqlite
+
+    >>> catalog.build('dots.sqlite', databases=['DOT'])
+    Builds a catalog of the DOTS database only
+
+    """
+
+    from concurrent.futures import ThreadPoolExecutor
+    from imfpy import sdmx, searches, transport
+
+    assert isinstance(max_workers, int) and max_workers > 0, "max_workers must be a positive int"
+    path = default_path() if path is None else os.path.abspath(os.path.expanduser(path))
+
+    #define IMF data services API start point
+    start_url = transport.base_url()
+
+    codes = searches.database_codes()
+    if databases is not None:
+        codes = codes[codes['Database ID'].isin(databases)]
+    descriptions = dict(zip(codes['Database ID'], codes['Description']))
+
+    def structure(database_id):
+        try:
+            return sdmx.DataStructure(database_id, transport.get_json(f'{start_url}/DataStructure/{database_id}'))
+        except AssertionError:
+            return None
+
+    def codelist(codelist_id):
+        try:
+            return next(transport.iter_items(f'{start_url}/CodeList/{codelist_id}', 'Structure.CodeLists.CodeList'), None)
+        except AssertionError:
+            return None
+
+    failed = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+
+        #request every data structure, then the codelists none of them embed
+        structures = dict(zip(descriptions, executor.map(structure, descriptions)))
+        failed += [database_id for database_id, found in structures.items() if found is None]
+        codelists, names = {}, {}
+        for found in structures.values():
+            if found is not None:
+                codelists.update(found.codelists)
+                names.update(found.names)
+        referenced = {dimension.get('@codelist') for found in structures.values() if found is not None
+                      for dimension in found.dimensions}
+        missing = sorted(codelist_id for codelist_id in referenced if codelist_id and codelist_id not in codelists)
+        for codelist_id, found in zip(missing, executor.map(codelist, missing)):
+            if found is None:
+                failed.append(codelist_id)
+                continue
+            codelists[codelist_id] = sdmx.as_list(found.get('Code'))
+            name = found.get('Name')
+            names[codelist_id] = name.get('#text') if isinstance(name, dict) else name
+
+    #write everything to a fresh file, then swap it in
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    if os.path.exists(temp):
+        os.remove(temp)
+    with closing(sqlite3.connect(temp)) as connection:
+        try:
+            connection.executescript(SCHEMA)
+        except sqlite3.OperationalError as e:
+            raise AssertionError("Error - the SQLite library in this Python has no FTS5 support.") from e
+        with connection:
+            connection.executemany('INSERT INTO databases VALUES (?, ?)', descriptions.items())
+            connection.executemany('INSERT INTO entries VALUES (?, ?, ?, ?, ?)',
+                                   [('database', database_id, None, database_id, description)
+                                    for database_id, description in descriptions.items()])
+            for database_id, found in structures.items():
+                if found is not None:
+                    connection.executemany('INSERT INTO dimensions VALUES (?, ?, ?, ?, ?)',
+                                           [(database_id, position, dimension.get('@conceptRef'),
+                                             dimension.get('@conceptSchemeRef'), dimension.get('@codelist'))
+                                            for position, dimension in enumerate(found.dimensions)])
+            for codelist_id, codelist_codes in codelists.items():
+                rows = [(codelist_id, position, code.get('@value'), (code.get('Description') or {}).get('#text'))
+                        for position, code in enumerate(codelist_codes)]
+                connection.executemany('INSERT INTO codes VALUES (?, ?, ?, ?)', rows)
+                connection.executemany('INSERT INTO entries VALUES (?, ?, ?, ?, ?)',
+                                       [('code', None, row[0], row[2], row[3]) for row in rows])
+                connection.execute('INSERT INTO entries VALUES (?, ?, ?, ?, ?)',
+                                   ('codelist', None, codelist_id, codelist_id, names.get(codelist_id)))
+            connection.executemany('INSERT INTO meta VALUES (?, ?)', [('built', str(time.time())), ('failed', ' '.join(failed))])
+        connection.execute("INSERT INTO entries (entries) VALUES ('optimize')")
+        connection.commit()
+    os.replace(temp, path)
+    with _lock:
+        _catalogs.pop(path, None)
+
+    return {'path': path, 'databases': len(descriptions), 'codelists': len(codelists),
+            'codes': sum(len(codelist_codes) for codelist_codes in codelists.values()), 'failed': failed}
+
+class Catalog:
+
+    """
+    Read-only access to a catalog built by build. Every query runs locally against SQLite.
+
+    Parameters
+    ----------
+    path : str (optional), default=None
+        The catalog file. Defaults to default_path().
+
+    Examples
+    --------
+    >>> catalog.Catalog().search("exports goods")
+    Returns the codes, codelists and databases matching both words, best first
+
+    """
+
+    def __init__(self, path=None):
+        self.path = default_path() if path is None else os.path.abspath(os.path.expanduser(path))
+        assert os.path.exists(self.path), f"No catalog found at {self.path}. Build one with: python -m imfpy.catalog build"
+        self._local = threading.local()
+
+    def _connection(self):
+
+        #sqlite connections cannot be shared between threads, so each thread opens its own
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            from pathlib import Path
+            connection = self._local.connection = sqlite3.connect(Path(self.path).as_uri() + '?mode=ro', uri=True)
+        return connection
+
+    def _frame(self, query, parameters, columns):
+        import pandas as pd
+        return pd.DataFrame(self._connection().execute(query, parameters).fetchall(), columns=columns)
+
+    def search(self, keyword, database_id=None, kind=None, limit=100):
+
+        """
+        Full-text search over databases, codelists and codes, ranked by relevance (bm25).
+        Every word of the keyword must appear, as a word or the start of one, in the code or description.
+        Not case or accent-sensitive. Codes are listed once per database using their codelist,
+        and at most limit rows are returned.
+        """
+
+        from imfpy import matching
+
+        columns = ['Kind', 'Database ID', 'Indicator ID', 'Series ID', 'Description']
+        words = matching.tokens(keyword)
+        if not words:
+            return self._frame('SELECT 1 WHERE 0', (), columns)
+
+        #quote each word so it is never read as query syntax, and match it as a prefix
+        query = ' '.join(f'"{word}"*' for word in words)
+        filters, parameters = '', [query]
+        if database_id is not None:
+            filters += ' AND (database_id = ? OR codelist IN (SELECT codelist FROM dimensions WHERE database_id = ?))'
+            parameters += [database_id, database_id]
+        if kind is not None:
+            filters += ' AND kind = ?'
+            parameters.append(kind)
+        parameters.append(limit)
+
+        #every entry gives at least one row, so the best limit entries are enough to fill limit rows
+        #and the limit is applied again once codes are listed per database
+        return self._frame(f'''
+            WITH hits AS (SELECT kind, database_id, codelist, code, description, bm25(entries) AS rank
+                          FROM entries WHERE entries MATCH ?{filters} ORDER BY rank LIMIT ?)
+            SELECT hits.kind, COALESCE(hits.database_id, used.database_id), hits.codelist,
+                   CASE WHEN hits.kind = 'code' THEN hits.code END, hits.description
+            FROM hits LEFT JOIN (SELECT DISTINCT database_id, codelist FROM dimensions) AS used
+                 ON hits.codelist = used.codelist {'AND used.database_id = ?' if database_id is not None else ''}
+            ORDER BY hits.rank, 2 LIMIT ?''', parameters + ([database_id] if database_id is not None else []) + [limit], columns)
+
+    def databases(self):
+
+        """ Returns the databases in the catalog, as searches.database_codes does """
+
+        return self._frame('SELECT database_id, description FROM databases ORDER BY database_id', (),
+                           ['Database ID', 'Description'])
+
+    def dimensions(self, database_id):
+
+        """ Returns the dimensions of a database in the catalog, as searches.database_dimensions does """
+
+        return self._frame('SELECT database_id, concept, scheme, codelist FROM dimensions WHERE database_id = ? ORDER BY position',
+                           (database_id,), ['Database ID', 'Concept', 'Scheme', 'Indicator ID'])
+
+    def codes(self, indicator_id):
+
+        """ Returns the codes of a codelist in the catalog, as searches.indicator_dimensions does """
+
+        return self._frame('SELECT codelist, code, description FROM codes WHERE codelist = ? ORDER BY position',
+                           (indicator_id,), ['Indicator ID', 'Series ID', 'Description'])
+
+    def built(self):
+
+        """ Returns when the catalog was built, in seconds since the epoch """
+
+        return float(self._connection().execute("SELECT value FROM meta WHERE key = 'built'").fetchone()[0])
+
+_catalogs = {}
+
+def get_catalog(path=None):
+
+    """ Returns the Catalog at a path (default_path() if None), opened once and reused """
+
+    path = default_path() if path is None else os.path.abspath(os.path.expanduser(path))
+    with _lock:
+        if path not in _catalogs:
+            _catalogs[path] = Catalog(path)
+        return _catalogs[path]
+
+def main(argv=None):
+
+    """
+    Command line entry point.
+
+    Examples
+    --------
+    $ python -m imfpy.catalog build --workers 16
+    Crawls every IMF database into the default catalog
+
+    $ python -m imfpy.catalog search "goods exports" --database DOT
+    Prints the best matches in the catalog
+
+    """
+
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='python -m imfpy.catalog', description='Build and search a local catalog of IMF metadata.')
+    parser.add_argument('--path', default=None, help='catalog file (default: $IMFPY_CATALOG or ~/.cache/imfpy/catalog.sqlite)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build_parser = commands.add_parser('build', help='crawl the API and (re)build the catalog')
+    build_parser.add_argument('--workers', type=int, default=MAX_WORKERS, help='concurrent requests')
+    build_parser.add_argument('--database', action='append', dest='databases', help='only crawl this database (repeatable)')
+    search_parser = commands.add_parser('search', help='search the catalog')
+    search_parser.add_argument('keyword')
+    search_parser.add_argument('--database', default=None, help='only search this database')
+    search_parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        summary = build(args.path, args.workers, args.databases)
+        print(f"Catalog of {summary['databases']} databases, {summary['codelists']} codelists "
+              f"and {summary['codes']} codes written to {summary['path']}")
+        if summary['failed']:
+            print(f"Could not retrieve: {' '.join(summary['failed'])}")
+    else:
+        import pandas as pd
+        with pd.option_context('display.max_rows', None, 'display.width', None, 'display.max_colwidth', 80):
+            print(Catalog(args.path).search(args.keyword, args.database, limit=args.limit).to_string(index=False))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,354 @@
+# -*- coding: utf-8 -*-
+
+#structured events emitted by transport and retrievals, with hooks, metrics and exporters
+import bisect, contextvars, threading, time
+from collections import namedtuple
+from contextlib import contextmanager
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+''' Upper bounds (in seconds) of the latency histogram buckets, an unbounded bucket is always added '''
+
+HTTPEvent = namedtuple('HTTPEvent', ['key', 'endpoint', 'status', 'bytes', 'latency', 'retries', 'cache'])
+HTTPEvent.__doc__ = '''
+Emitted for every response body obtained by the transport: key is the URL relative to the base URL,
+endpoint its first part (such as 'CompactData'), status the HTTP status (None if the connection failed),
+bytes the size of the body, latency the seconds from the first attempt until the body was read (including retries),
+retries the number of attempts retried, and cache 'hit' or 'miss' when the on-disk cache is enabled, otherwise None.
+'''
+StageEvent = namedtuple('StageEvent', ['stage', 'seconds', 'cpu', 'peak', 'context'])
+StageEvent.__doc__ = '''
+Emitted when a processing stage ends, such as 'decode', 'build' or 'pivot' in retrievals.dots:
+seconds is its wall time, cpu the CPU time of the thread running it, peak the highest memory (in bytes)
+allocated during the stage above what was allocated at its start when tracemalloc is tracing
+(otherwise, or before Python 3.9, None),
+and context a dict describing the work (such as the country and counterparts).
+'''
+
+CacheEvent = namedtuple('CacheEvent', ['cache', 'key', 'result'])
+CacheEvent.__doc__ = '''
+Emitted when a call is answered from an in-memory cache, such as the series retrievals.dots keeps ('series'):
+key describes the entry (such as 'A.US.GB' for frequency, country and counterpart), and result is 'hit' when
+the entry covered the whole window, 'partial' when only the missing months were requested, and 'miss' otherwise.
+Responses served from the on-disk cache are reported by HTTPEvent.cache instead.
+'''
+
+_subscribers = ()
+_listeners = contextvars.ContextVar('imfpy_listeners', default=())
+_lock = threading.Lock()
+_high_water = 0
+
+def subscribe(callback):
+
+    """
+    Calls callback with every event (HTTPEvent, StageEvent or CacheEvent) from now on, in the thread that emits it.
+    Callbacks should be quick and must not raise.
+
+    Parameters
+    ----------
+    callback : callable
+        Called with one event at a time, such as a Metrics or print.
+
+    Returns
+    -------
+    callback : callable
+        The callback, so subscribe can be used as a decorator.
+
+    Examples
+    --------
+    >>> events.subscribe(print)
+    Prints every request and processing stage as it happens
+
+    """
+
+    global _subscribers
+
+    assert callable(callback), "callback must be callable"
+    with _lock:
+        _subscribers = _subscribers + (callback,)
+    return callback
+
+def unsubscribe(callback):
+
+    """ Stops calling a callback passed to subscribe """
+
+    global _subscribers
+
+    with _lock:
+        _subscribers = tuple(subscriber for subscriber in _subscribers if subscriber is not callback)
+
+@contextmanager
+def listen(callback):
+
+    """
+    Context manager calling callback with the events emitted inside it, in this thread or task only
+    (and in the threads retrievals.dots starts for it), unlike subscribe which receives events from everywhere.
+
+    Examples
+    --------
+    >>> with events.listen(print):
+    ...     retrievals.dots('US', ['GB', 'FR'], 2000, 2005)
+    Prints the requests and stages of this call, but not those of other threads
+
+    """
+
+    assert callable(callback), "callback must be callable"
+    token = _listeners.set(_listeners.get() + (callback,))
+    try:
+        yield callback
+    finally:
+        _listeners.reset(token)
+
+def active():
+
+    """ Returns whether any callback receives events here, so emitters can skip preparing events nobody receives """
+
+    return bool(_subscribers or _listeners.get())
+
+def emit(event):
+
+    """ Passes an event to every subscribed callback, and to the callbacks listening in this context """
+
+    for callback in _subscribers + _listeners.get():
+        callback(event)
+
+@contextmanager
+def stage(name, **context):
+
+    """
+    Context manager timing a processing stage and emitting a StageEvent when it ends.
+    Costs nothing but the check when no callback receives events.
+
+    Examples
+    --------
+    >>> with events.stage('pivot', country='US'):
+    ...     wide = long.pivot(...)
+
+    """
+
+    if not active():
+        yield
+        return
+    import tracemalloc
+    tracing = tracemalloc.is_tracing() and hasattr(tracemalloc, 'reset_peak')
+    if tracing:
+        #peaks of stages running at the same time in several threads overlap
+        base = tracemalloc.get_traced_memory()[0]
+        _reset_peak()
+    started, cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        seconds, cpu = time.perf_counter() - started, time.thread_time() - cpu
+        peak = max(0, tracemalloc.get_traced_memory()[1] - base) if tracing else None
+        emit(StageEvent(name, seconds, cpu, peak, context))
+
+def _reset_peak():
+
+    #tracemalloc keeps a single peak, remember it before a stage resets it to measure its own
+    global _high_water
+    import tracemalloc
+    with _lock:
+        _high_water = max(_high_water, tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+
+def peak_memory():
+
+    """
+    Returns the highest memory (bytes) traced by tracemalloc since reset_peak_memory,
+    including the peaks stages reset to measure their own. Needs tracemalloc tracing and Python 3.9 or later.
+    """
+
+    import tracemalloc
+    with _lock:
+        return max(_high_water, tracemalloc.get_traced_memory()[1])
+
+def reset_peak_memory():
+
+    """ Starts measuring peak_memory from the memory traced now """
+
+    global _high_water
+    import tracemalloc
+    with _lock:
+        _high_water = 0
+        tracemalloc.reset_peak()
+
+class Histogram:
+
+    """
+    Cumulative histogram of durations, in the form of Prometheus histograms.
+
+    Parameters
+    ----------
+    buckets : tuple of float (optional), default=BUCKETS
+        Upper bounds of the buckets, in increasing order.
+
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count, self.sum = 0, 0.0
+
+    def observe(self, value):
+
+        """ Adds a value to the histogram """
+
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+
+        """ Returns (upper bound, number of values at most that bound) pairs, ending with float('inf') """
+
+        total, pairs = 0, []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+    def to_dict(self):
+
+        """ Returns the count, sum and cumulative buckets (keyed by upper bound, '+Inf' last) as a dict """
+
+        return {'count': self.count, 'sum': self.sum,
+                'buckets': {('+Inf' if bound == float('inf') else repr(bound)): total for bound, total in self.cumulative()}}
+
+class Metrics:
+
+    """
+    Aggregates events into counters and latency histograms. Subscribe it (see collect),
+    then read it as a dict, or export it as JSON or in the Prometheus text format.
+
+    Counters cover HTTP responses by endpoint and status, on-disk cache hits and misses, retries, bytes received,
+    and hits and misses of the in-memory caches (see CacheEvent).
+    Histograms cover HTTP latency by endpoint, and the wall time of each processing stage.
+
+    Parameters
+    ----------
+    buckets : tuple of float (optional), default=BUCKETS
+        Upper bounds (in seconds) of the histogram buckets.
+
+    Examples
+    --------
+    >>> metrics = events.subscribe(events.Metrics())
+    >>> retrievals.dots('US', ['GB', 'FR'], 2000, 2005)
+    >>> print(metrics.to_prometheus())
+    Prints counters and histograms of the requests sent and the stages of dots
+
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+
+        """ Clears every counter and histogram """
+
+        with self._lock:
+            self.requests = {}
+            self.cache = {}
+            self.retries = 0
+            self.bytes = 0
+            self.latency = {}
+            self.stages = {}
+            self.memory = {}
+
+    def __call__(self, event):
+        with self._lock:
+            if isinstance(event, HTTPEvent):
+                status = 'error' if event.status is None else str(event.status)
+                self.requests[(event.endpoint, status)] = self.requests.get((event.endpoint, status), 0) + 1
+                if event.cache is not None:
+                    self.cache[event.cache] = self.cache.get(event.cache, 0) + 1
+                self.retries += event.retries
+                self.bytes += event.bytes
+                if event.cache != 'hit':
+                    self.latency.setdefault(event.endpoint, Histogram(self.buckets)).observe(event.latency)
+            elif isinstance(event, StageEvent):
+                self.stages.setdefault(event.stage, Histogram(self.buckets)).observe(event.seconds)
+            elif isinstance(event, CacheEvent):
+                self.memory[(event.cache, event.result)] = self.memory.get((event.cache, event.result), 0) + 1
+
+    def to_dict(self):
+
+        """ Returns the counters and histograms as a dict that can be dumped to JSON """
+
+        with self._lock:
+            return {'http': {'requests': [{'endpoint': endpoint, 'status': status, 'count': count}
+                                          for (endpoint, status), count in sorted(self.requests.items())],
+                             'cache': dict(sorted(self.cache.items())),
+                             'retries': self.retries,
+                             'bytes': self.bytes,
+                             'latency': {endpoint: histogram.to_dict() for endpoint, histogram in sorted(self.latency.items())}},
+                    'stages': {name: histogram.to_dict() for name, histogram in sorted(self.stages.items())},
+                    'cache': [{'cache': cache, 'result': result, 'count': count}
+                              for (cache, result), count in sorted(self.memory.items())]}
+
+    def to_json(self, **kwargs):
+
+        """ Returns the metrics (see to_dict) as a JSON string, passing kwargs (such as indent) to json.dumps """
+
+        import json
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def to_prometheus(self, prefix='imfpy'):
+
+        """ Returns the metrics in the Prometheus text exposition format, with names starting with prefix """
+
+        data = self.to_dict()
+        lines = [f'# HELP {prefix}_http_requests_total Responses received, by endpoint and status',
+                 f'# TYPE {prefix}_http_requests_total counter']
+        lines += [f'{prefix}_http_requests_total{{endpoint="{row["endpoint"]}",status="{row["status"]}"}} {row["count"]}'
+                  for row in data['http']['requests']]
+        lines += [f'# HELP {prefix}_http_cache_total Responses served from (hit) or stored to (miss) the on-disk cache',
+                  f'# TYPE {prefix}_http_cache_total counter']
+        lines += [f'{prefix}_http_cache_total{{result="{result}"}} {count}' for result, count in data['http']['cache'].items()]
+        lines += [f'# HELP {prefix}_cache_total Calls answered from (hit), partly from (partial) or not from (miss) in-memory caches',
+                  f'# TYPE {prefix}_cache_total counter']
+        lines += [f'{prefix}_cache_total{{cache="{row["cache"]}",result="{row["result"]}"}} {row["count"]}' for row in data['cache']]
+        lines += [f'# HELP {prefix}_http_retries_total Attempts retried after throttling, errors or broken responses',
+                  f'# TYPE {prefix}_http_retries_total counter', f'{prefix}_http_retries_total {data["http"]["retries"]}',
+                  f'# HELP {prefix}_http_response_bytes_total Bytes of response bodies received',
+                  f'# TYPE {prefix}_http_response_bytes_total counter', f'{prefix}_http_response_bytes_total {data["http"]["bytes"]}']
+        for name, label, help_text, histograms in [
+                ('http_latency_seconds', 'endpoint', 'Seconds from sending a request until its body was read', data['http']['latency']),
+                ('stage_seconds', 'stage', 'Wall time of processing stages', data['stages'])]:
+            lines += [f'# HELP {prefix}_{name} {help_text}', f'# TYPE {prefix}_{name} histogram']
+            for value, histogram in histograms.items():
+                lines += [f'{prefix}_{name}_bucket{{{label}="{value}",le="{bound}"}} {total}'
+                          for bound, total in histogram['buckets'].items()]
+                lines += [f'{prefix}_{name}_sum{{{label}="{value}"}} {histogram["sum"]!r}',
+                          f'{prefix}_{name}_count{{{label}="{value}"}} {histogram["count"]}']
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+
+        """ Writes the metrics to a file, as JSON if path ends with .json and in the Prometheus text format otherwise """
+
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(self.to_json(indent=1) if str(path).endswith('.json') else self.to_prometheus())
+
+@contextmanager
+def collect(metrics=None):
+
+    """
+    Context manager aggregating the events emitted inside it into a Metrics.
+
+    Examples
+    --------
+    >>> with events.collect() as metrics:
+    ...     retrievals.dots('US', ['GB', 'FR'], 2000, 2005)
+    >>> metrics.write('dots.prom')
+    Writes counters and latency histograms of the call for a Prometheus textfile collector
+
+    """
+
+    metrics = Metrics() if metrics is None else metrics
+    subscribe(metrics)
+    try:
+        yield metrics
+    finally:
+        unsubscribe(metrics)
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+
+#record responses from the API to fixture files, and replay them without the network
+import gzip, hashlib, io, json, os, threading
+from contextlib import contextmanager
+from imfpy import transport
+
+class FixtureStore:
+
+    """
+    A directory of recorded API responses, keyed by request relative to the base URL
+    (such as 'CompactData/DOT/A.US.TXG_FOB_USD.GB?startPeriod=2000&endPeriod=2005'),
+    so fixtures recorded against the IMF can be replayed against any base URL.
+    Bodies are stored gzip-compressed, with an index.json listing the recorded requests.
+
+    Parameters
+    ----------
+    path : str
+        Directory holding the fixtures. Created if it does not exist.
+
+    """
+
+    def __init__(self, path):
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self._lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+        try:
+            with open(os.path.join(self.path, 'index.json'), encoding='utf-8') as file:
+                self.index = json.load(file)
+        except (OSError, ValueError):
+            self.index = {}
+
+    @staticmethod
+    def key(url):
+
+        """ Returns the part of url after the base URL (or url itself if it is elsewhere) """
+
+        return transport.url_key(url)
+
+    def _file(self, key):
+        return os.path.join(self.path, hashlib.sha256(key.encode('utf-8')).hexdigest()[:32] + '.json.gz')
+
+    def save(self, key, content):
+
+        """ Stores the body (bytes) of the response to the request key (see key) """
+
+        with open(self._file(key), 'wb') as file:
+            file.write(gzip.compress(content))
+        with self._lock:
+            self.index[key] = os.path.basename(self._file(key))
+            with open(os.path.join(self.path, 'index.json'), 'w', encoding='utf-8') as file:
+                json.dump(self.index, file, indent=1, sort_keys=True)
+
+    def load(self, key):
+
+        """ Returns the recorded body (bytes) of the response to the request key, or None """
+
+        try:
+            with open(self._file(key), 'rb') as file:
+                return gzip.decompress(file.read())
+        except OSError:
+            return None
+
+    def keys(self):
+
+        """ Returns the recorded request keys """
+
+        return sorted(self.index)
+
+class Replayed:
+
+    """ A minimal stand-in for requests.Response holding a recorded body """
+
+    def __init__(self, url, content):
+        self.url, self.content = url, content
+        self.status_code = 200
+        self.headers = {'Content-Type': 'application/json'}
+        self.raw = io.BytesIO(content)
+
+    def close(self):
+        pass
+
+    def __repr__(self):
+        return f'<Response [{self.status_code}]>'
+
+class RecordingTransport(transport.Transport):
+
+    """
+    A Transport that sends requests as usual and saves every successful response to a FixtureStore.
+    Takes the same keyword arguments as Transport.
+
+    Examples
+    --------
+    >>> transport.set_transport(fixtures.RecordingTransport('tests/fixtures'))
+    Records every response received from now on to tests/fixtures.
+
+    """
+
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.fixtures = FixtureStore(path)
+
+    def get(self, url, stream=False):
+
+        #read the whole body so it can be saved, then hand it on as if it was streamed
+        r = super().get(url, stream=False)
+        if r.status_code == 200:
+            self.fixtures.save(self.fixtures.key(url), r.content)
+            if stream:
+                r.raw = io.BytesIO(r.content)
+        return r
+
+class ReplayTransport(transport.Transport):
+
+    """
+    A Transport that answers every request from a FixtureStore, without the network or rate limiting.
+    A request that was not recorded raises an AssertionError. Takes the same keyword arguments as Transport.
+
+    Examples
+    --------
+    >>> transport.set_transport(fixtures.ReplayTransport('tests/fixtures'))
+    Answers every request from the responses recorded in tests/fixtures.
+
+    """
+
+    def __init__(self, path, **kwargs):
+        kwargs.setdefault('limiter', transport.RateLimiter(rate=1e9, burst=10**9, max_rate=1e9))
+        super().__init__(**kwargs)
+        self.fixtures = FixtureStore(path)
+
+    def get(self, url, stream=False):
+        content = self.fixtures.load(self.fixtures.key(url))
+        assert content is not None, f"No recorded response for {url}"
+        return Replayed(url, content)
+
+@contextmanager
+def _using(new_transport):
+    old = transport.get_transport()
+    transport.set_transport(new_transport)
+    try:
+        yield new_transport
+    finally:
+        #closed transports reopen their connections on next use, so the old one can be put back
+        transport.set_transport(old)
+
+def record(path, **kwargs):
+
+    """
+    Context manager recording every response received inside it to fixtures in path.
+
+    Examples
+    --------
+    >>> with fixtures.record('tests/fixtures'):
+    ...     retrievals.dots('US', ['GB', 'FR'], 2000, 2005)
+    Saves the responses needed to replay this call offline
+
+    """
+
+    return _using(RecordingTransport(path, **kwargs))
+
+def replay(path, **kwargs):
+
+    """
+    Context manager answering every request inside it from the fixtures in path, without the network.
+
+    Examples
+    --------
+    >>> with fixtures.replay('tests/fixtures'):
+    ...     retrievals.dots('US', ['GB', 'FR'], 2000, 2005)
+    Returns the same data as when it was recorded
+
+    """
+
+    return _using(ReplayTransport(path, **kwargs))
@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+
+#prebuilt indexes that answer the keyword searches in searches without scanning whole frames
+import re, threading, unicodedata
+from collections import Counter, OrderedDict
+from functools import lru_cache
+
+NGRAM = 3
+''' Length of the character n-grams in the inverted index '''
+PATTERN_CACHE_SIZE = 256
+''' Maximum number of compiled regular expressions kept for regex searches '''
+FUZZY_CANDIDATES = 50
+''' Number of rows (sharing the most n-grams with a keyword) scored per keyword when rapidfuzz is not installed '''
+INDEX_CACHE_SIZE = 64
+''' Maximum number of SearchIndex objects kept by get_index '''
+
+def fold(text):
+
+    """
+    Normalizes text for matching: lowercased, with accents and other combining marks removed.
+
+    Examples
+    --------
+    >>> matching.fold("Côte d'Ivoire")
+    "cote d'ivoire"
+
+    """
+
+    text = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+def tokens(text):
+
+    """ Splits text into folded words, dropping punctuation """
+
+    return re.findall(r'\w+', fold(text))
+
+def ratio(a, b):
+
+    """ Similarity of two strings from 0 to 100, based on their longest matching blocks """
+
+    from difflib import SequenceMatcher
+    return SequenceMatcher(None, a, b).ratio() * 100
+
+def token_score(a, b):
+
+    """
+    Scores how well two lists of words (see tokens) match, from 0 to 100.
+    The score averages a token-sort ratio (both sides' words sorted) and a token-set ratio
+    (shared words compared against each side's leftovers), so word order and extra words
+    such as "Rep. of" cost little while typos are still scored by edit similarity.
+
+    Examples
+    --------
+    >>> matching.token_score(matching.tokens("Korea, Rep"), matching.tokens("Korea, Rep. of"))
+    92.857...
+
+    """
+
+    if not a or not b:
+        return 0.0
+    sort_score = ratio(' '.join(sorted(a)), ' '.join(sorted(b)))
+    shared = sorted(set(a) & set(b))
+    base = ' '.join(shared)
+    rest_a = ' '.join([base] + sorted(set(a) - set(shared))).strip()
+    rest_b = ' '.join([base] + sorted(set(b) - set(shared))).strip()
+    set_score = ratio(rest_a, rest_b)
+    if shared:
+        set_score = max(set_score, ratio(base, rest_a), ratio(base, rest_b))
+    return (sort_score + set_score) / 2
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def compile_pattern(pattern):
+
+    """ Compiles a regular expression, reusing patterns compiled before """
+
+    return re.compile(pattern)
+
+class SearchIndex:
+
+    """
+    Index over a text column of a codes DataFrame (such as searches.country_cache),
+    built once so each search only touches the rows that can match.
+    Text is folded (see fold) and every n-gram of it is mapped to the rows containing it.
+    A plain keyword search intersects the rows of the keyword's n-grams, then checks those candidates.
+
+    Parameters
+    ----------
+    frame : pandas.core.frame.DataFrame
+        The DataFrame to search. Searches return rows of it.
+    column : str
+        The column holding the text to search, such as 'Country'.
+    n : int (optional), default=NGRAM
+        Length of the n-grams in the inverted index.
+
+    Examples
+    --------
+    >>> index = matching.SearchIndex(searches.country_codes(), 'Country')
+    >>> index.search("germany")
+    Returns the rows of the country codes matching "germany"
+
+    """
+
+    def __init__(self, frame, column, n=NGRAM):
+        self.frame, self.column, self.n = frame, column, n
+        self.texts = [text if isinstance(text, str) else '' for text in frame[column].tolist()]
+        self.folded = [fold(text) for text in self.texts]
+        self.grams = {}
+        for position, text in enumerate(self.folded):
+            for gram in {text[i:i+n] for i in range(len(text) - n + 1)}:
+                self.grams.setdefault(gram, []).append(position)
+
+    def positions(self, keyword, regex=False):
+
+        """
+        Returns the positions of the rows matching a keyword, in order.
+        Plain keywords are matched as substrings of the folded text, so they are not case or accent-sensitive.
+        Regular expressions are searched in the original text.
+        """
+
+        if regex:
+            pattern = compile_pattern(keyword)
+            return [position for position, text in enumerate(self.texts) if pattern.search(text)]
+
+        keyword = fold(keyword)
+        n = self.n
+        if len(keyword) < n:
+            candidates = range(len(self.folded))
+        else:
+            #only rows holding every n-gram of the keyword can contain it, starting from the rarest
+            postings = sorted((self.grams.get(keyword[i:i+n], []) for i in range(len(keyword) - n + 1)), key=len)
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                if not candidates:
+                    break
+                candidates.intersection_update(posting)
+            candidates = sorted(candidates)
+        return [position for position in candidates if keyword in self.folded[position]]
+
+    def _fuzzy_table(self):
+
+        #precomputed words of each row, built on first fuzzy use
+        if not hasattr(self, '_words'):
+            self._words = [tokens(text) for text in self.texts]
+            self._joined = [' '.join(words) for words in self._words]
+        return self._words, self._joined
+
+    def match(self, keywords, limit=1, cutoff=80):
+
+        """
+        Ranks the rows against each keyword with a fuzzy score (see token_score) that tolerates typos,
+        missing words and word order, such as "Korea, Rep" or "Turkiye".
+        Scoring uses rapidfuzz when installed and difflib otherwise, in which case only the
+        FUZZY_CANDIDATES rows sharing the most n-grams with a keyword are scored.
+        Scores can differ slightly between the two.
+
+        Parameters
+        ----------
+        keywords : list of str
+            The text to resolve.
+        limit : int (optional), default=1
+            Maximum number of rows returned per keyword, best first.
+        cutoff : float (optional), default=80
+            Minimum score (0-100) of a returned row.
+
+        Returns
+        -------
+        matches : list of list
+            For each keyword, (position, score) pairs of the best rows, by decreasing score then row order.
+
+        """
+
+        words, joined = self._fuzzy_table()
+        if not joined:
+            return [[] for keyword in keywords]
+        try:
+            from rapidfuzz import fuzz, process
+        except ImportError:
+            process = None
+
+        queries = [tokens(keyword) for keyword in keywords]
+        matches = []
+        if process is not None:
+            import numpy as np
+
+            #score every keyword against every row at once
+            texts = [' '.join(query) for query in queries]
+            scores = process.cdist(texts, joined, scorer=fuzz.token_sort_ratio, processor=None, workers=-1)
+            scores = (scores + process.cdist(texts, joined, scorer=fuzz.token_set_ratio, processor=None, workers=-1)) / 2
+            for query, row in zip(queries, scores):
+                best = np.argsort(-row, kind='stable')[:limit]
+                matches.append([(int(position), float(row[position])) for position in best
+                                if query and row[position] >= cutoff])
+            return matches
+
+        n = self.n
+        for keyword, query in zip(keywords, queries):
+            #score only the rows sharing the most n-grams with the keyword
+            text = fold(keyword)
+            shared = Counter(position for gram in {text[i:i+n] for i in range(len(text) - n + 1)}
+                             for position in self.grams.get(gram, []))
+            candidates = [position for position, count in shared.most_common(FUZZY_CANDIDATES)] or range(len(words))
+            scored = [(position, token_score(query, words[position])) for position in candidates]
+            scored = sorted((pair for pair in scored if pair[1] >= cutoff), key=lambda pair: (-pair[1], pair[0]))
+            matches.append(scored[:limit])
+        return matches
+
+    def resolve(self, keywords, limit=1, cutoff=80):
+
+        """
+        Returns the best rows for each of a list of keywords (see match) in one DataFrame,
+        with leading Keyword and Score columns. A keyword without a row above the cutoff gets one
+        row of missing values, so with limit=1 there is exactly one row per keyword, in order.
+        """
+
+        import numpy as np
+
+        #repeated keywords are only scored once
+        unique = list(dict.fromkeys(keywords))
+        found = dict(zip(unique, self.match(unique, limit, cutoff)))
+        rows = [(keyword, position, score) for keyword in keywords
+                for position, score in (found[keyword] or [(-1, np.nan)])]
+
+        #gather all rows with a single take, blanking keywords without a match
+        positions = np.array([row[1] for row in rows], dtype=np.intp)
+        if len(self.frame):
+            result = self.frame.iloc[np.maximum(positions, 0)].reset_index(drop=True)
+            result.loc[positions < 0, :] = None
+        else:
+            result = self.frame.reset_index(drop=True).reindex(range(len(rows)))
+        result.insert(0, 'Keyword', [row[0] for row in rows])
+        result.insert(1, 'Score', np.array([row[2] for row in rows], dtype=float))
+        return result
+
+    def search(self, keyword, regex=False):
+
+        """ Returns the rows of the frame matching a keyword (see positions) """
+
+        return self.frame.iloc[self.positions(keyword, regex)]
+
+    def search_many(self, keywords, regex=False):
+
+        """
+        Returns the rows matching each of a list of keywords in one DataFrame, with a leading Keyword column.
+        Repeated keywords are only looked up once. Keywords are kept in order, rows of each keyword in frame order.
+        """
+
+        import numpy as np
+
+        found = {}
+        for keyword in keywords:
+            if keyword not in found:
+                found[keyword] = self.positions(keyword, regex)
+
+        #gather all rows with a single take, and label each with its keyword
+        matches = [found[keyword] for keyword in keywords]
+        positions = np.fromiter((position for match in matches for position in match), dtype=np.intp)
+        labels = np.repeat(np.array(list(keywords), dtype=object), [len(match) for match in matches])
+        result = self.frame.iloc[positions].reset_index(drop=True)
+        result.insert(0, 'Keyword', labels)
+        return result
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+def get_index(name, frame=None, column=None):
+
+    """
+    Returns the SearchIndex kept under a name (such as 'country'), building it over a column of a frame on first use.
+    The index is rebuilt if a different frame is passed for the same name (e.g. a refreshed cache).
+    Without a frame, returns the index kept under the name, or None.
+    The INDEX_CACHE_SIZE most recently used indexes are kept.
+    """
+
+    with _indexes_lock:
+        index = _indexes.get(name)
+        if frame is not None and (index is None or index.frame is not frame or index.column != column):
+            index = _indexes[name] = SearchIndex(frame, column)
+            while len(_indexes) > INDEX_CACHE_SIZE:
+                _indexes.popitem(last=False)
+        if index is not None:
+            _indexes.move_to_end(name)
+        return index
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+
+#opt-in profiles of where retrievals spend their time and memory, built from the events of each stage
+import threading, time
+from contextlib import contextmanager
+from imfpy import events
+
+COLUMNS = ['stage', 'counterparts', 'key', 'wall', 'cpu', 'peak', 'bytes']
+''' Columns of Profile.to_frame: one row per stage or request '''
+REPORT_ROWS = 10
+''' Number of counterparts listed in a report, slowest first '''
+
+class Profile:
+
+    """
+    Wall time, CPU time and memory peak of each stage and request of the calls made while it listens (see profile).
+    Wall time well above CPU time in a stage means it was waiting, usually on the network:
+    responses are downloaded (and parsed as they arrive when streaming) inside 'decode', so it includes the download
+    and 'request' shows its share.
+    Memory peaks need tracemalloc, and overlap when several requests are decoded at once (use max_workers=1 to separate them).
+
+    Attributes
+    ----------
+    records : list of dict
+        One dict per stage or request, with the keys in COLUMNS.
+    wall, cpu, peak : float
+        Totals of the profiled block: seconds of wall time, seconds of CPU time (all threads)
+        and the highest memory (bytes) allocated above the start, or None without tracemalloc.
+
+    """
+
+    def __init__(self, records=None, wall=None, cpu=None, peak=None):
+        self.records = list(records or [])
+        self.wall, self.cpu, self.peak = wall, cpu, peak
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        if isinstance(event, events.StageEvent):
+            counterparts = event.context.get('counterpart', event.context.get('counterparts'))
+            if isinstance(counterparts, (list, tuple)):
+                counterparts = '+'.join(counterparts)
+            elif not isinstance(counterparts, str):
+                counterparts = None
+            record = {'stage': event.stage, 'counterparts': counterparts, 'key': None,
+                      'wall': event.seconds, 'cpu': event.cpu, 'peak': event.peak, 'bytes': None}
+        elif isinstance(event, events.HTTPEvent):
+            record = {'stage': 'request', 'counterparts': None, 'key': event.key,
+                      'wall': event.latency, 'cpu': None, 'peak': None, 'bytes': event.bytes}
+        else:
+            return
+        with self._lock:
+            self.records.append(record)
+
+    def to_dict(self):
+
+        """ Returns the profile as a dict of plain values (as kept in DataFrame.attrs), see from_dict """
+
+        return {'wall': self.wall, 'cpu': self.cpu, 'peak': self.peak, 'records': list(self.records)}
+
+    @classmethod
+    def from_dict(cls, data):
+
+        """ Rebuilds a Profile from the dict returned by to_dict """
+
+        return cls(data['records'], data['wall'], data['cpu'], data['peak'])
+
+    def to_frame(self):
+
+        """ Returns the records as a DataFrame, one row per stage or request in the order they ended """
+
+        import pandas as pd
+        return pd.DataFrame(self.records, columns=COLUMNS)
+
+    def stages(self):
+
+        """ Returns the number of calls, total wall and CPU time, highest memory peak and bytes of each stage """
+
+        #sums of columns a stage never fills (such as the CPU time of requests) are left missing
+        total = lambda values: values.sum(min_count=1)
+        frame = self.to_frame()
+        totals = frame.groupby('stage', sort=False).agg(calls=('wall', 'size'), wall=('wall', 'sum'), cpu=('cpu', total),
+                                                         peak=('peak', 'max'), bytes=('bytes', total))
+        return totals.sort_values('wall', ascending=False)
+
+    def counterparts(self):
+
+        """
+        Returns the wall time, CPU time and highest memory peak spent on each counterpart, slowest first.
+        Stages covering several counterparts (such as decoding a request for many of them)
+        are shared evenly between them.
+        """
+
+        import pandas as pd
+
+        rows = []
+        for record in self.records:
+            if record['stage'] == 'request' or not record['counterparts']:
+                continue
+            names = record['counterparts'].split('+')
+            for name in names:
+                rows.append({'counterpart': name, 'stage': record['stage'], 'wall': record['wall'] / len(names),
+                             'cpu': record['cpu'] / len(names), 'peak': record['peak']})
+        frame = pd.DataFrame(rows, columns=['counterpart', 'stage', 'wall', 'cpu', 'peak'])
+        totals = frame.groupby('counterpart').agg(wall=('wall', 'sum'), cpu=('cpu', 'sum'), peak=('peak', 'max'))
+        return totals.sort_values('wall', ascending=False)
+
+    def report(self, rows=REPORT_ROWS):
+
+        """ Returns a printable report: totals, then time per stage, then the slowest counterparts """
+
+        lines = ['Profile: ' + ', '.join(part for part in [
+            f'{self.wall:.3f} s wall' if self.wall is not None else None,
+            f'{self.cpu:.3f} s CPU' if self.cpu is not None else None,
+            f'{self.peak / 1e6:.1f} MB peak memory' if self.peak is not None else None] if part)]
+        if not self.records:
+            return '\n'.join(lines + ['No stages recorded.'])
+
+        stages = self.stages()
+        stages['peak'], stages['bytes'] = stages['peak'] / 1e6, stages['bytes'] / 1e6
+        lines += ['', stages.rename(columns={'wall': 'wall (s)', 'cpu': 'CPU (s)', 'peak': 'peak (MB)', 'bytes': 'received (MB)'})
+                  .to_string(float_format=lambda value: f'{value:.4f}', na_rep='-')]
+        counterparts = self.counterparts()
+        if len(counterparts):
+            counterparts['peak'] = counterparts['peak'] / 1e6
+            lines += ['', f'Slowest counterparts ({min(rows, len(counterparts))} of {len(counterparts)}):',
+                      counterparts.head(rows).rename(columns={'wall': 'wall (s)', 'cpu': 'CPU (s)', 'peak': 'peak (MB)'})
+                      .to_string(float_format=lambda value: f'{value:.4f}', na_rep='-')]
+        return '\n'.join(lines)
+
+    def __str__(self):
+        return self.report()
+
+@contextmanager
+def profile(memory=True):
+
+    """
+    Context manager profiling the retrievals made inside it, in this thread (see Profile).
+    Memory tracking starts tracemalloc (unless already tracing), which slows Python down
+    while it runs. Use memory=False to measure time only.
+
+    Examples
+    --------
+    >>> with profiling.profile() as prof:
+    ...     dots('US', ['GB', 'FR', 'JP'], 1990, 2020, freq='M')
+    >>> print(prof.report())
+    Prints how long each stage and counterpart took, and how much memory they needed
+
+    """
+
+    import tracemalloc
+
+    started_tracing = memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    measure = tracemalloc.is_tracing() and hasattr(tracemalloc, 'reset_peak')
+    if measure:
+        base = tracemalloc.get_traced_memory()[0]
+        events.reset_peak_memory()
+
+    prof = Profile()
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        with events.listen(prof):
+            yield prof
+    finally:
+        prof.wall, prof.cpu = time.perf_counter() - wall, time.process_time() - cpu
+        prof.peak = max(0, events.peak_memory() - base) if measure else None
+        if started_tracing:
+            tracemalloc.stop()
+
+def report(profiled, rows=REPORT_ROWS):
+
+    """
+    Returns the printable report (see Profile.report) of a DataFrame returned by dots with profile=True, or of a Profile.
+
+    Examples
+    --------
+    >>> d = dots('US', ['GB', 'FR', 'JP'], 1990, 2020, freq='M', profile=True)
+    >>> print(profiling.report(d))
+
+    """
+
+    if not isinstance(profiled, Profile):
+        data = getattr(profiled, 'attrs', {}).get('profile')
+        assert data is not None, "No profile found. Please pass a DataFrame returned with profile=True, or a Profile."
+        profiled = Profile.from_dict(data)
+    return profiled.report(rows)
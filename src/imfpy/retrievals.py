@@ -1,8 +1,47 @@
-def dots(country, counterparts, start, end, freq='A', form="wide"):
+import threading, time
+from collections import OrderedDict, namedtuple
+from imfpy import events
+from imfpy.transport import SingleFlight
+
+MAX_URL_LENGTH = 2000
+''' Maximum length of a CompactData request URL '''
+BATCH_SIZE = 60
+''' Maximum number of counterparts joined into a single CompactData request '''
+CHUNK_YEARS = 10
+''' Default number of years covered by each request for monthly data '''
+SERIES_CACHE_SIZE = 4096
+''' Maximum number of (frequency, country, counterpart) series kept in memory by dots '''
+SERIES_CACHE_TTL = 24*60*60
+''' Time (in seconds) for which series kept in memory by dots are reused '''
+REVISIONS = {'A': 2, 'M': 6}
+''' Default number of most recent periods refetched by refresh, as the IMF revises recent data '''
+
+MATRIX_PAIRS = 600
+''' Maximum number of country-partner pairs requested at once by trade_matrix '''
+
+TradeMatrix = namedtuple('TradeMatrix', ['values', 'countries', 'partners', 'periods', 'series', 'available'])
+TradeMatrix.__doc__ = ''' Bilateral trade data returned by trade_matrix, values are indexed [country, partner, period, series] '''
+
+class _NotFound(AssertionError):
+    
+    """ Raised by dots when the API returns no series for some counterparts (listed in missing), which refresh reads as nothing new """
+    
+    def __init__(self, message, missing=()):
+        super().__init__(message)
+        self.missing = list(missing)
+
+_series_cache = OrderedDict()
+_series_lock = threading.Lock()
+_flights = SingleFlight()
+
+def dots(country, counterparts, start, end, freq='A', form="wide", max_workers=4, chunk_years=CHUNK_YEARS, cache=True, profile=False):
     
     """
     Highly flexible function to return time series trade data between countries from the IMF Direction of Trade (DOTS) Database.
     The function sends a get request to the IMF JSON RESTful API. 
+    Counterparts are joined into as few requests as possible (see BATCH_SIZE and MAX_URL_LENGTH),
+    and long monthly windows are split into chunks of years that are fetched concurrently.
+    Retrieved series are kept in memory, so repeated and narrower queries do not hit the API again.
 
     Parameters
     ----------
@@ -32,6 +71,23 @@ def dots(country, counterparts, start, end, freq='A', form="wide"):
         If multiple counterparts, should the returned data be wide-form or long-form?
         Default: 'wide' (MultiIndex)
         Alternatives: 'long'
+    max_workers: int (optional, default=4)
+        If the counterparts do not fit in a single request,
+        the maximum number of requests sent concurrently.
+        Use max_workers=1 to send requests one at a time.
+    chunk_years: int or None (optional, default=CHUNK_YEARS)
+        For monthly data, the number of years covered by each request.
+        Chunks are aligned to multiples of chunk_years (decades by default)
+        and merged back in order. Use None to send the whole window in one request.
+    cache: bool (optional, default=True)
+        Whether to serve the window from series kept in memory by earlier calls.
+        Only the parts of the window that are not cached are requested,
+        and the retrieved series are kept for later calls. 
+        Use retrievals.clear_cache() to empty the cache.
+    profile: bool (optional, default=False)
+        Whether to record the wall time, CPU time and memory peak of each stage, request and counterpart
+        into full_df.attrs['profile'], printable with profiling.report(full_df).
+        Profiling tracks memory with tracemalloc, which slows the call down (see profiling.profile).
 
     Returns
     -------
@@ -62,67 +118,63 @@ def dots(country, counterparts, start, end, freq='A', form="wide"):
     assert isinstance(counterparts, (str, list)), "counterparts must be a str or list"
     if isinstance(counterparts, list):
         assert len(counterparts) > 1, "counterparts must be a str or list of length 2 or more"
+        assert all(isinstance(counterpart, str) for counterpart in counterparts), "counterparts must only contain str"
         assert country not in counterparts, "country must not be in counterparts"
     else:
         assert country != counterparts, "country and counterpart must not be the same"
-    assert isinstance(start, (int,float)),"start must be a number"
-    assert isinstance(end, (int,float)), "end must be a number"
     assert freq=="M" or freq=="A", "frequency must be M or A"
     assert form in ['long', 'wide'], "form must be long or wide"
-    assert start > 1800 and start < 2200, "start must be a reasonable date"
-    assert end > 1800 and end < 2200, "end must be a reasonable date"
-    assert end >= start, "end must be after start"
+    assert isinstance(max_workers, int) and max_workers > 0, "max_workers must be a positive int"
+    assert chunk_years is None or (isinstance(chunk_years, int) and chunk_years > 0), "chunk_years must be a positive int or None"
+    assert isinstance(cache, bool), "cache must be a bool"
+    assert isinstance(profile, bool), "profile must be a bool"
     
-    #transform mismatchedfrequency and start/end dates, if applicable
-    if freq=="A" and isinstance(start, float):
-        start = int(start)
-    if freq=="A" and isinstance(end, float):
-        end = int(end)+1
+    #validate the start/end dates and transform them if they mismatch the frequency
+    start, end = _window(start, end, freq)
+    
+    #run the call again inside a profile, and keep the profile with the result
+    if profile:
+        from imfpy import profiling
+        with profiling.profile() as prof:
+            full_df = dots(country, counterparts, start, end, freq, form, max_workers, chunk_years, cache)
+        full_df.attrs['profile'] = prof.to_dict()
+        return full_df
     
     #import libraries and define base URL for API
-    import requests, dateutil.parser
     import pandas as pd
-    start_url = "http://dataservices.imf.org/REST/SDMX_JSON.svc/"
+    from imfpy import sdmx, transport
+    start_url = transport.base_url()
     
     #Specify all available series for trade (exports, imports and trade balance)
     series = 'TBG_USD+TXG_FOB_USD+TMG_CIF_USD' 
     
-    #define subfunction to handle single requests
-    def retrieve(counterpart):
-        
-        request = f'{start_url}CompactData/DOT/{freq}.{country}.{series}.{counterpart}?startPeriod={start}&endPeriod={end}'
-
-        #Send the get request to the API
-        r = requests.get(request)
-        print(r)
-        
-        #assert the response was 200 (OK)
-        assert r.status_code==200, "Error - HTTP Request unsuccessful. Please try again."
-            
-        #convert the data to subscriptable json 
-        data_json = r.json()
+    #define subfunction to build the request URL for a batch of counterparts over a chunk of time
+    def request_url(batch, chunk):
+        return f'{start_url}/CompactData/DOT/{freq}.{country}.{series}.{"+".join(batch)}?startPeriod={chunk[0]}&endPeriod={chunk[1]}'
+    
+    #define subfunction to build a dataframe from the decoded exports, imports and trade balance series
+    def compile_frame(found):
         
         try:
-            #extract exports, imports and trade balance portions of the JSON (they are lists)
-            exports = data_json['CompactData']['DataSet']['Series'][0]['Obs']
-            imports = data_json['CompactData']['DataSet']['Series'][1]['Obs']
-            tbal = data_json['CompactData']['DataSet']['Series'][2]['Obs']
+            #extract exports, imports and trade balance portions of the decoded series
+            exports = found['TXG_FOB_USD']
+            imports = found['TMG_CIF_USD']
+            tbal = found['TBG_USD']
             
         #if series is not found, throw an error.    
         except KeyError:
-            raise AssertionError("One or more series not found. Please try again.")
+            raise _NotFound("One or more series not found. Please try again.")
 
+        #Unpack the time periods and values decoded for each series
+        periods, values_exports = exports
+        _, values_imports = imports
+        _, values_tbal = tbal
+        
         #Make sure all series are the same length
-        assert len(exports)==len(imports), "Error - data not available. Try a different time period or frequency."
-    
-        #Parse time periods and values for each series
-        periods = [dateutil.parser.parse(obs['@TIME_PERIOD']) for obs in exports]
-        values_exports = [float(obs['@OBS_VALUE']) for obs in exports]
-        values_imports = [float(obs['@OBS_VALUE']) for obs in imports]
-        values_tbal = [float(obs['@OBS_VALUE']) for obs in tbal]
+        assert len(values_exports)==len(values_imports)==len(values_tbal), "Error - data not available. Try a different time period or frequency."
   
         #Convert to a pandas dataframe
-        compile_df = pd.DataFrame({'Period':periods,
+        compile_df = pd.DataFrame({'Period':sdmx.format_periods(periods, freq),
                                 'Exports':values_exports, 
                                 'Imports':values_imports, 
                                 'Trade Balance':values_tbal})
@@ -133,45 +185,544 @@ def dots(country, counterparts, start, end, freq='A', form="wide"):
         #Return the dataframe
         return compile_df
     
-    #subfunction to format date correctly based on user input frequency
-    def format_date(full_df):
-        if freq=="A":
-            full_df['Period'] = full_df['Period'].apply('{:%Y}'.format)
-        else:
-            full_df['Period'] = full_df['Period'].apply('{:%Y-%m}'.format)  
-        return full_df
+    #define subfunction to handle a single (batched) request over a chunk of time
+    #returns a dict of decoded series keyed by counterpart and indicator
+    def retrieve(task):
+        batch, chunk = task
+        url = request_url(batch, chunk)
+
+        #Send the get request to the API and stream the returned series one at a time
+        #split them back out by counterpart and indicator, decoding each Obs array into columns as it arrives
+        def decode():
+            found = {counterpart: {} for counterpart in batch}
+            with events.stage('decode', country=country, counterparts=batch, start=chunk[0], end=chunk[1]):
+                for series_data in transport.iter_items(url, 'CompactData.DataSet.Series'):
+                    counterpart = series_data.get('@COUNTERPART_AREA')
+                    if counterpart in found:
+                        found[counterpart][series_data.get('@INDICATOR')] = sdmx.decode_obs(series_data.get('Obs'))
+            return found
+        
+        #threads asking for the same data at the same moment share one request and its decoded arrays
+        return _flights.do(url, decode)
+    
+    #work out the part of the window each counterpart still needs, after what is cached in memory
+    #counterparts that need the same interval are requested together
+    requested = [counterparts] if isinstance(counterparts, str) else counterparts
+    unique = list(dict.fromkeys(requested))
+    low, high = _to_month(start, freq, False), _to_month(end, freq, True)
+    params = {low: _format_bound(start, freq), high: _format_bound(end, freq)}
+    entries, plans = {}, {}
+    #series are cached per server, so pointing requests elsewhere never serves another server's data
+    server = transport.base_url()
+    for counterpart in unique:
+        entries[counterpart] = _cache_get((server, freq, country, counterpart, series)) if cache else None
+        needed = _missing(entries[counterpart], low, high)
+        for interval in needed:
+            plans.setdefault(interval, []).append(counterpart)
+        if cache and events.active():
+            result = 'miss' if entries[counterpart] is None else 'partial' if needed else 'hit'
+            events.emit(events.CacheEvent('series', f'{freq}.{country}.{counterpart}', result))
+    
+    #join counterparts into as few requests as the URL and batch limits allow
+    #and split long monthly windows into chunks of years
+    tasks, intervals = [], []
+    for interval, missing in plans.items():
+        bounds = tuple(params.get(bound, _format_month(bound, freq)) for bound in interval)
+        chunks = _plan_chunks(bounds[0], bounds[1], chunk_years) if freq=="M" else [bounds]
+        for batch in _batch_keys(missing, max(len(request_url([], chunk)) for chunk in chunks)):
+            for chunk in chunks:
+                tasks.append((batch, chunk))
+                intervals.append(interval)
     
-    #if counterparts is a list of countries, send a request for each country
-    #append it to a master dataframe in long form
+    #send the requests concurrently if there are several, results come back in order
+    #each request runs in a copy of this context, so callbacks listening here (see events.listen) receive its events
+    if len(tasks) > 1 and max_workers > 1:
+        import contextvars
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(tasks))) as executor:
+            futures = [executor.submit(contextvars.copy_context().run, retrieve, task) for task in tasks]
+            results = [future.result() for future in futures]
+    else:
+        results = [retrieve(task) for task in tasks]
+    
+    #collect the new parts of each series and the intervals they cover
+    fetched = {}
+    for interval, result in zip(intervals, results):
+        for counterpart, found in result.items():
+            parts, covered = fetched.setdefault(counterpart, ({}, []))
+            covered.append(interval)
+            for indicator, decoded in found.items():
+                parts.setdefault(indicator, []).append(decoded)
+    
+    #merge new parts with the cached series in order, dropping periods repeated where chunks meet
+    #then slice out the requested window
+    retrieved, absent = {}, []
+    for counterpart in unique:
+        with events.stage('build', country=country, counterpart=counterpart):
+            entry = entries[counterpart]
+            if counterpart in fetched:
+                parts, covered = fetched[counterpart]
+                if entry is not None and (low, high) not in covered:
+                    covered = covered + [(entry['low'], entry['high'])]
+                    for indicator, decoded in entry['data'].items():
+                        parts.setdefault(indicator, []).append(decoded)
+                data = {indicator: sdmx.merge_obs(decoded) for indicator, decoded in parts.items()}
+                entry = {'low': min(interval[0] for interval in covered),
+                         'high': max(interval[1] for interval in covered),
+                         'data': data}
+                
+                #only the months up to the first and last observations count as covered,
+                #so periods published later (or never) are requested again, as they would be without the cache
+                observed = [periods for periods, _ in data.values() if len(periods)]
+                if cache and observed:
+                    first = min(periods[0] for periods in observed)
+                    last = max(periods[-1] for periods in observed) + (11 if freq=="A" else 0)
+                    _cache_put((server, freq, country, counterpart, series),
+                               dict(entry, low=max(entry['low'], first), high=min(entry['high'], last)))
+            try:
+                retrieved[counterpart] = compile_frame({indicator: sdmx.slice_obs(decoded, low, high)
+                                                        for indicator, decoded in entry['data'].items()})
+            except _NotFound:
+                absent.append(counterpart)
+    if absent:
+        raise _NotFound("One or more series not found. Please try again.", absent)
+    
+    #if counterparts is a list of countries, collect the frame for each country
+    #concatenate them into a master dataframe in long form
     #pivot to wide and return
     if isinstance(counterparts, list):
         
-        full_df = pd.DataFrame()
-        for counterpart in counterparts:
-            retrieved = retrieve(counterpart)
-            retrieved.insert(1,"Counterpart",counterpart)
-            full_df = full_df.append(retrieved) #if long-form data requested, stop here
-        
-        #format dates correctly based on the user-specified frequency
-        full_df = format_date(full_df)
+        with events.stage('combine', country=country, counterparts=len(counterparts)):
+            frames = []
+            for counterpart in counterparts:
+                frame = retrieved[counterpart].copy()
+                frame.insert(1,"Counterpart",counterpart)
+                frames.append(frame)
+            full_df = pd.concat(frames) #if long-form data requested, stop here
         
         if(form=="wide"): #otherwise, pivot to wide form data
-            full_df.insert(1,"Country",country)
-            full_df = full_df.pivot(index="Period",
-                    columns='Counterpart', 
-                    values=['Exports', 'Imports', 'Trade Balance', 'Twoway Trade'])
-            full_df.insert(0,"Country",country)
+            with events.stage('pivot', country=country, counterparts=len(counterparts)):
+                full_df = _to_wide(full_df, country)
         else:
             full_df.insert(1,"Country",country) #if long-form data, insert country at position 1
         
     #if counterparts is a single country, create columns for country, counterpart
     #and return the result of that single request
     else:
-        full_df = retrieve(counterparts)
+        full_df = retrieved[counterparts]
         full_df.insert(1,'Country',country)
         full_df.insert(2,'Counterpart',counterparts)
         
-        #format dates correctly based on the user-specified frequency
-        full_df = format_date(full_df)
+    return full_df
+
+def refresh(dots_dataframe, revisions=None, end=None, max_workers=4):
+    
+    """
+    Brings a DataFrame returned by dots up to date, fetching only the newest periods.
+    For each counterpart, the last period held is found and only later periods are requested,
+    together with a short window of recent periods that the IMF may have revised.
+    Counterparts with nothing published in that window keep their rows unchanged.
+    
+    Parameters
+    ----------
+    dots_dataframe : pandas.core.frame.DataFrame (required)
+        A long-form or wide-form DataFrame returned by dots (or a previous refresh).
+    revisions : int (optional), default=None
+        Number of most recent periods held that are fetched again and replaced.
+        Defaults to REVISIONS for the frequency of the data (2 years or 6 months).
+    end : int (optional), default=None
+        Last year to fetch. Defaults to the current year.
+    max_workers : int (optional), default=4
+        Maximum number of requests sent concurrently, as in dots.
+        
+    Returns
+    -------
+    full_df : pandas.core.frame.DataFrame
+        The data with new and revised periods merged in, in the same form as dots_dataframe.
+    
+    Examples
+    --------
+    >>> d = dots('US', ['CN', 'MX'], 1980, 2020, freq='M')
+    >>> d = refresh(d)
+    Fetches the last 6 months held and every later month, and merges them into d.
+    
+    >>> refresh(d, revisions=0)
+    Fetches only the months after the last one held.
+    
+    """
+    
+    import datetime
+    import numpy as np
+    import pandas as pd
+    
+    #check the user has entered possible inputs
+    assert isinstance(dots_dataframe, pd.DataFrame), "dots_dataframe must be a DataFrame"
+    assert not dots_dataframe.empty, "dots_dataframe must not be empty"
+    assert revisions is None or (isinstance(revisions, int) and revisions >= 0), "revisions must be a non-negative int"
+    assert end is None or isinstance(end, int), "end must be an int"
+    
+    #work in long form, whatever form the data came in
+    wide = isinstance(dots_dataframe.columns, pd.MultiIndex)
+    long_df = _to_long(dots_dataframe) if wide else dots_dataframe
+    try:
+        country = long_df.Country.unique()[0]
+        counterparts = list(long_df.Counterpart.unique())
+        periods = long_df.Period.astype(str)
+    except AttributeError:
+        raise AssertionError("Wrong data form. Please enter a DataFrame returned by retrievals.dots.")
+    
+    #annual periods are formatted YYYY, monthly periods YYYY-MM
+    freq = "A" if periods.str.len().max()==4 else "M"
+    revisions = REVISIONS[freq] if revisions is None else revisions
+    end = datetime.date.today().year if end is None else end
+    
+    #find the first period to fetch for each counterpart, and group counterparts that share it
+    step = 12 if freq=="A" else 1
+    starts = {}
+    for counterpart, group in periods.groupby(long_df.Counterpart, sort=False):
+        first = np.datetime64(group.max(), 'M') - (revisions - 1) * step
+        starts.setdefault(first, []).append(counterpart)
+    
+    #fetch each group and replace the rows from its first period on
+    frames = {counterpart: long_df[long_df.Counterpart==counterpart] for counterpart in counterparts}
+    for first, group in starts.items():
+        year, month = int(str(first)[:4]), int(str(first)[5:7])
+        if year > end:
+            continue
+        fetch = lambda batch: dots(country, batch if len(batch) > 1 else batch[0],
+                                   year if freq=="A" else round(year + month/100, 2), end if freq=="A" else end + 0.12,
+                                   freq, "long", max_workers, cache=False)
+        
+        #the API returns no series for counterparts with nothing published in the window
+        #those keep their rows as they are, the rest of the group is fetched again without them
+        try:
+            fetched = fetch(group)
+        except _NotFound as e:
+            group = [counterpart for counterpart in group if counterpart not in e.missing]
+            if not group:
+                continue
+            fetched = fetch(group)
+        cutoff = _format_month(first, freq)
+        for counterpart in group:
+            kept = frames[counterpart][frames[counterpart].Period.astype(str) < cutoff]
+            frames[counterpart] = pd.concat([kept, fetched[fetched.Counterpart==counterpart]])
+    
+    #put the counterparts back together in their original order and form
+    full_df = pd.concat([frames[counterpart].reset_index(drop=True) for counterpart in counterparts])
+    if wide:
+        full_df = _to_wide(full_df, country)
+    return full_df
+
+def trade_matrix(countries, partners, start, end, freq='A', max_workers=4, memmap=None):
+    
+    """
+    Retrieves every country against every partner from the IMF Direction of Trade (DOTS) Database
+    into one NumPy array, for gravity models and other bilateral work.
+    Countries and partners are joined into '+' keys (or a wildcard for all partners),
+    so the whole matrix takes a handful of requests rather than one per pair.
+    
+    Parameters
+    ----------
+    countries : list or None (required)
+        Country codes of the reporting countries. None for every country in searches.country_codes().
+    partners : list or None (required)
+        Country codes of the partner countries. None for every country in searches.country_codes(),
+        which is requested with a wildcard key.
+    start: int or float (required)
+        Start date of the series, as in dots.
+    end: int or float (required)
+        End date of the series, as in dots.
+    freq: str (optional, default='A')
+        Frequency of the time series, 'A' (annual) or 'M' (monthly).
+    max_workers: int (optional, default=4)
+        Maximum number of requests sent concurrently.
+    memmap: str (optional, default=None)
+        Path of a .npy file backing the array on disk instead of in memory.
+        The file can be reopened later without copying with numpy.load(memmap, mmap_mode='r').
         
-    return full_df
\ No newline at end of file
+    Returns
+    -------
+    matrix : TradeMatrix
+        A named tuple of
+        values, a float64 array of shape (countries, partners, periods, 3), NaN where there is no data;
+        countries, partners and periods, the labels of the first three axes;
+        series, the labels of the last axis ('Exports', 'Imports', 'Trade Balance');
+        available, a bool array of shape (countries, partners), True for pairs with data.
+    
+    Examples
+    --------
+    >>> m = trade_matrix(['US', 'CN', 'DE'], ['US', 'CN', 'DE', 'JP'], 2000, 2020)
+    >>> m.values[0, 1, :, 0]
+    Returns annual US exports to China between 2000 and 2020.
+    
+    >>> trade_matrix(None, None, 1990, 2020, freq='M', memmap='dots.npy')
+    Retrieves the full monthly matrix into a memory-mapped file.
+    
+    """
+    
+    import numpy as np
+    from imfpy import sdmx, transport
+    
+    #validate input datatypes
+    for codes in [countries, partners]:
+        assert codes is None or (isinstance(codes, list) and codes and all(isinstance(code, str) for code in codes)), "countries and partners must be lists of str or None"
+    assert freq=="M" or freq=="A", "frequency must be M or A"
+    assert isinstance(max_workers, int) and max_workers > 0, "max_workers must be a positive int"
+    assert memmap is None or isinstance(memmap, str), "memmap must be a str"
+    start, end = _window(start, end, freq)
+    
+    #fill in every country code for None, partners are then requested with a wildcard
+    wildcard = partners is None
+    if countries is None or partners is None:
+        from imfpy import searches
+        codes = list(searches.country_codes()['Country Code'])
+        countries = codes if countries is None else countries
+        partners = codes if partners is None else partners
+    countries, partners = list(dict.fromkeys(countries)), list(dict.fromkeys(partners))
+    
+    #preallocate the array, filled with NaN for pairs and periods without data
+    low, high = _to_month(start, freq, False), _to_month(end, freq, True)
+    step = 12 if freq=="A" else 1
+    periods = np.arange(low, high + 1, step)
+    series = ['TXG_FOB_USD', 'TMG_CIF_USD', 'TBG_USD']
+    shape = (len(countries), len(partners), len(periods), len(series))
+    if memmap is None:
+        values = np.full(shape, np.nan)
+    else:
+        values = np.lib.format.open_memmap(memmap, mode='w+', dtype='float64', shape=shape)
+        values[:] = np.nan
+    available = np.zeros(shape[:2], dtype=bool)
+    country_index = {code: i for i, code in enumerate(countries)}
+    partner_index = {code: i for i, code in enumerate(partners)}
+    series_index = {code: i for i, code in enumerate(series)}
+    
+    #plan the requests: batches of partners (or a wildcard), batches of countries and chunks of time
+    start_url = transport.base_url()
+    def request_url(country_batch, partner_batch, chunk):
+        return (f'{start_url}/CompactData/DOT/{freq}.{"+".join(country_batch)}.{"+".join(series)}.{"+".join(partner_batch)}'
+                f'?startPeriod={chunk[0]}&endPeriod={chunk[1]}')
+    bounds = (_format_bound(start, freq), _format_bound(end, freq))
+    chunks = _plan_chunks(bounds[0], bounds[1], CHUNK_YEARS) if freq=="M" else [bounds]
+    partner_batches = [[]] if wildcard else _batch_keys(partners, len(request_url([], [], bounds)) + MAX_URL_LENGTH//2)
+    pairs = max(len(partners) if wildcard else len(batch) for batch in partner_batches)
+    country_batches = _batch_keys(countries, len(request_url([], max(partner_batches, key=len), bounds)),
+                                  max_size=max(1, MATRIX_PAIRS // pairs))
+    tasks = [(c, p, chunk) for c in country_batches for p in partner_batches for chunk in chunks]
+    
+    #define subfunction to send one request and write its series straight into the array
+    def retrieve(task):
+        for series_data in transport.iter_items(request_url(*task), 'CompactData.DataSet.Series'):
+            i = country_index.get(series_data.get('@REF_AREA'))
+            j = partner_index.get(series_data.get('@COUNTERPART_AREA'))
+            k = series_index.get(series_data.get('@INDICATOR'))
+            if i is None or j is None or k is None:
+                continue
+            obs_periods, obs_values = sdmx.decode_obs(series_data.get('Obs'))
+            obs_periods, obs_values = sdmx.slice_obs((obs_periods, obs_values), low, high)
+            values[i, j, (obs_periods - low).astype(int) // step, k] = obs_values
+            available[i, j] = True
+    
+    #send the requests concurrently if there are several
+    if len(tasks) > 1 and max_workers > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(tasks))) as executor:
+            list(executor.map(retrieve, tasks))
+    else:
+        for task in tasks:
+            retrieve(task)
+    
+    if memmap is not None:
+        values.flush()
+    return TradeMatrix(values, countries, partners, sdmx.format_periods(periods, freq),
+                       ['Exports', 'Imports', 'Trade Balance'], available)
+
+def _to_wide(full_df, country):
+    
+    """ Pivots long-form dots data to wide form (MultiIndex columns by counterpart) """
+    
+    full_df = full_df.pivot(index="Period",
+            columns='Counterpart', 
+            values=['Exports', 'Imports', 'Trade Balance', 'Twoway Trade'])
+    full_df.insert(0,"Country",country)
+    return full_df
+
+def _to_long(full_df):
+    
+    """ Unpivots wide-form dots data back to long form """
+    
+    try:
+        country = full_df['Country'].iloc[0]
+        long_df = full_df.drop(columns='Country', level=0).stack('Counterpart').reset_index()
+    except KeyError:
+        raise AssertionError("Wrong data form. Please enter a DataFrame returned by retrievals.dots.")
+    long_df.insert(1, "Country", country)
+    return long_df[['Period', 'Country', 'Counterpart', 'Exports', 'Imports', 'Trade Balance', 'Twoway Trade']]
+
+def clear_cache():
+    
+    """
+    Empties the in-memory cache of series retrieved by dots.
+    It is also emptied whenever the shared Transport is replaced (see transport.set_transport).
+    
+    Examples
+    --------
+    >>> retrievals.clear_cache()
+    The next call to dots requests every series from the API again.
+    
+    """
+    
+    with _series_lock:
+        _series_cache.clear()
+
+def _cache_get(key):
+    
+    """ Returns the cached entry for a (base URL, freq, country, counterpart, series) key, or None if missing or stale """
+    
+    with _series_lock:
+        entry = _series_cache.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry['stored'] > SERIES_CACHE_TTL:
+            del _series_cache[key]
+            return None
+        _series_cache.move_to_end(key)
+        return entry
+
+def _cache_put(key, entry):
+    
+    """ Stores an entry, evicting the least recently used series beyond SERIES_CACHE_SIZE """
+    
+    with _series_lock:
+        _series_cache[key] = dict(entry, stored=time.time())
+        _series_cache.move_to_end(key)
+        while len(_series_cache) > SERIES_CACHE_SIZE:
+            _series_cache.popitem(last=False)
+
+def _window(start, end, freq):
+    
+    """
+    Validates a start and end date entered as numbers (1980 or 1980.02) for a frequency,
+    and returns them as dots requests them: annual windows entered with months start
+    at the start year and end at the year after the end year.
+    """
+    
+    assert isinstance(start, (int,float)),"start must be a number"
+    assert isinstance(end, (int,float)), "end must be a number"
+    assert start > 1800 and start < 2200, "start must be a reasonable date"
+    assert end > 1800 and end < 2200, "end must be a reasonable date"
+    assert end >= start, "end must be after start"
+    if freq=="M":
+        assert round(start % 1 * 100) <= 12, "start month must be between 01 and 12"
+        assert round(end % 1 * 100) <= 12, "end month must be between 01 and 12"
+    
+    #transform mismatched frequency and start/end dates, if applicable
+    if freq=="A" and isinstance(start, float):
+        start = int(start)
+    if freq=="A" and isinstance(end, float):
+        end = int(end)+1
+    return start, end
+
+def _to_month(value, freq, is_end):
+    
+    """
+    Converts a start or end date entered as a number (1980 or 1980.02) to a numpy datetime64 month.
+    Whole years start in January and end in December.
+    """
+    
+    import numpy as np
+    year = int(value)
+    month = round((value - year) * 100) if freq=="M" else 0
+    if month == 0:
+        month = 12 if is_end else 1
+    return np.datetime64(f'{year:04d}-{month:02d}', 'M')
+
+def _format_bound(value, freq):
+    
+    """
+    Formats a start or end date entered as a number (1980 or 1980.02) as a startPeriod/endPeriod parameter.
+    Months are always written with two digits, so 1980.1 is sent as 1980.10 (October).
+    """
+    
+    year = int(value)
+    month = round((value - year) * 100) if freq=="M" else 0
+    return f'{year}.{month:02d}' if month else str(year)
+
+def _format_month(month, freq):
+    
+    """ Formats a numpy datetime64 month as a startPeriod/endPeriod parameter """
+    
+    return str(month)[:4] if freq=="A" else str(month)
+
+def _missing(entry, low, high):
+    
+    """
+    Returns the (low, high) intervals of months that are not covered by a cached entry.
+    The whole window is returned if nothing is cached, or if the cached months do not touch the window.
+    """
+    
+    if entry is None or high < entry['low'] - 1 or low > entry['high'] + 1:
+        return [(low, high)]
+    intervals = []
+    if low < entry['low']:
+        intervals.append((low, entry['low'] - 1))
+    if high > entry['high']:
+        intervals.append((entry['high'] + 1, high))
+    return intervals
+
+def _plan_chunks(start, end, chunk_years):
+    
+    """
+    Splits the window between start and end into (start, end) pairs covering at most chunk_years each.
+    Interior boundaries fall on whole years that are multiples of chunk_years,
+    the first and last chunk keep the start and end as given (numbers or YYYY-MM strings).
+    """
+    
+    if chunk_years is None:
+        return [(start, end)]
+    first, last = int(str(start)[:4]), int(str(end)[:4])
+    breaks = [year for year in range(first + 1, last + 1) if year % chunk_years == 0]
+    starts = [start] + breaks
+    ends = [year - 1 for year in breaks] + [end]
+    return list(zip(starts, ends))
+
+def _batch_keys(codes, base_length, max_length=MAX_URL_LENGTH, max_size=BATCH_SIZE):
+    
+    """
+    Splits a list of codes into batches to be joined with '+' in a single request key.
+    Each batch holds at most max_size codes and keeps the request URL,
+    of which base_length characters are already used, within max_length.
+    """
+    
+    batches, batch, length = [], [], base_length
+    for code in codes:
+        added = len(code) + (1 if batch else 0)
+        if batch and (len(batch) >= max_size or length + added > max_length):
+            batches.append(batch)
+            batch, length = [], base_length
+            added = len(code)
+        batch.append(code)
+        length += added
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+async def adots(country, counterparts, start, end, freq='A', form="wide", max_workers=4, chunk_years=CHUNK_YEARS, cache=True, profile=False):
+    
+    """
+    Awaitable version of dots for use inside an asyncio event loop.
+    Requests run on the shared worker pool in imfpy.aio and never block the loop.
+    Takes the same parameters and returns the same DataFrame as dots.
+    
+    Examples
+    --------
+    >>> await adots('US', 'CN', 1995, 2020)
+    Returns wide-form US-China annual data between 1995 and 2020.
+    
+    >>> await asyncio.gather(*[adots('US', c, 2000, 2020) for c in ['CN', 'MX', 'CA']])
+    Keeps the three queries in flight at once.
+    
+    """
+    
+    from imfpy import aio
+    return await aio.run(dots, country, counterparts, start, end, freq, form, max_workers, chunk_years, cache, profile)
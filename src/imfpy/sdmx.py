@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+
+#helpers for decoding SDMX JSON payloads returned by the API
+import numpy as np
+
+def as_list(value):
+    
+    """
+    The JSON API returns a dict rather than a list when there is only one element.
+    Wraps single elements in a list so Series and Obs can always be iterated.
+    """
+    
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+def walk(data_json, path):
+    
+    """
+    Yields the elements of the list (or the single element) at a dot-separated path in decoded JSON.
+    Nothing is yielded if the path is missing.
+    """
+    
+    for key in path.split('.'):
+        if not isinstance(data_json, dict) or key not in data_json:
+            return
+        data_json = data_json[key]
+    yield from as_list(data_json)
+
+def iter_path(stream, path):
+    
+    """
+    Incrementally parses a JSON stream with ijson and yields the elements of the list 
+    (or the single element) at a dot-separated path as soon as each one is complete.
+    Only one element is held in memory at a time.
+    
+    Parameters
+    ----------
+    stream : file-like
+        A binary stream of JSON, such as a response body.
+    path : str
+        Dot-separated keys leading to a list, such as 'CompactData.DataSet.Series'
+    
+    """
+    
+    import ijson
+    
+    item_path = path + '.item'
+    builder, depth = None, 0
+    for prefix, event, value in ijson.parse(stream):
+        if builder is None:
+            #skip everything outside the path, and the opening of the list itself
+            if prefix not in (path, item_path) or event in ('end_map', 'end_array', 'map_key'):
+                continue
+            if prefix == path and event == 'start_array':
+                continue
+            if event not in ('start_map', 'start_array'):
+                yield value
+                continue
+            #start building an element that opens at the path (single element) or inside it (list)
+            builder, depth = ijson.ObjectBuilder(), 0
+        builder.event(event, value)
+        if event in ('start_map', 'start_array'):
+            depth += 1
+        elif event in ('end_map', 'end_array'):
+            depth -= 1
+            if depth == 0:
+                yield builder.value
+                builder = None
+
+def decode_obs(obs):
+    
+    """
+    Decodes an SDMX Obs array into NumPy arrays of periods and values in one pass.
+    Time periods in the YYYY or YYYY-MM formats are parsed by NumPy, without dateutil.
+    Missing values are decoded as NaN.
+    
+    Parameters
+    ----------
+    obs : list or dict
+        The Obs portion of a Series in a CompactData response.
+        
+    Returns
+    -------
+    periods : numpy.ndarray
+        Time periods as datetime64[M]. Annual periods fall on January.
+    values : numpy.ndarray
+        Observation values as float64.
+    
+    Examples
+    --------
+    >>> sdmx.decode_obs([{'@TIME_PERIOD': '2020-01', '@OBS_VALUE': '1.5'}])
+    (array(['2020-01'], dtype='datetime64[M]'), array([1.5]))
+    
+    """
+    
+    obs = as_list(obs)
+    if not obs:
+        return np.array([], dtype='datetime64[M]'), np.array([], dtype='float64')
+    
+    #pull both fields out of the dicts in a single pass, then convert whole columns at once
+    pairs = np.array([(o['@TIME_PERIOD'], o.get('@OBS_VALUE', 'nan')) for o in obs])
+    try:
+        periods = pairs[:, 0].astype('datetime64[M]')
+        values = pairs[:, 1].astype('float64')
+    except ValueError:
+        raise AssertionError("Error - unexpected time period or value in response.")
+    
+    return periods, values
+
+def merge_obs(parts):
+    
+    """
+    Merges decoded (periods, values) pairs from consecutive requests into one pair, in order.
+    Where requests overlap, the first value for a repeated period is kept.
+    """
+    
+    if len(parts) == 1:
+        return parts[0]
+    periods = np.concatenate([part[0] for part in parts])
+    values = np.concatenate([part[1] for part in parts])
+    
+    #keep the first occurrence of each period, in sorted order
+    periods, index = np.unique(periods, return_index=True)
+    return periods, values[index]
+
+def slice_obs(decoded, low, high):
+    
+    """
+    Returns the part of a decoded (periods, values) pair between two datetime64 months, inclusive.
+    """
+    
+    periods, values = decoded
+    mask = (periods >= low) & (periods <= high)
+    return periods[mask], values[mask]
+
+def format_periods(periods, freq):
+    
+    """
+    Formats datetime64 periods as strings, YYYY for annual (freq='A') and YYYY-MM for monthly data.
+    """
+    
+    return np.datetime_as_string(periods, unit='Y' if freq=='A' else 'M')
+
+class DataStructure:
+    
+    """
+    The parts of a DataStructure document used by the searches functions, parsed once:
+    the annotations and dimensions of the database, and every codelist embedded in the document.
+    Instances are shared between callers (see searches.data_structure), so treat them as read-only.
+    
+    Parameters
+    ----------
+    database_id : str
+        The database ID the document describes.
+    data_json : dict
+        The decoded DataStructure response.
+    
+    Attributes
+    ----------
+    annotations : list of dict
+        Annotation elements (AnnotationTitle, AnnotationText) of the database.
+    dimensions : list of dict
+        Dimension elements (@conceptRef, @conceptSchemeRef, @codelist, ...) of the database.
+    codelists : dict
+        Code elements (@value, Description) of each embedded codelist, keyed by codelist ID in document order.
+    names : dict
+        Name of each embedded codelist, keyed by codelist ID.
+    
+    """
+    
+    def __init__(self, database_id, data_json):
+        self.database_id = database_id
+        self.annotations = list(walk(data_json, 'Structure.KeyFamilies.KeyFamily.Annotations.Annotation'))
+        self.dimensions = list(walk(data_json, 'Structure.KeyFamilies.KeyFamily.Components.Dimension'))
+        self.codelists, self.names = {}, {}
+        for codelist in walk(data_json, 'Structure.CodeLists.CodeList'):
+            self.codelists[codelist.get('@id')] = as_list(codelist.get('Code'))
+            name = codelist.get('Name')
+            self.names[codelist.get('@id')] = name.get('#text') if isinstance(name, dict) else name
+    
+    def codelist(self, concept):
+        
+        """ Returns the codes of the codelist used by a dimension (such as 'REF_AREA'), or None if there is none """
+        
+        for dimension in self.dimensions:
+            if dimension.get('@conceptRef') == concept:
+                return self.codelists.get(dimension.get('@codelist'))
+        return None
+    
+    def __repr__(self):
+        return f"<DataStructure {self.database_id}: {len(self.dimensions)} dimensions, {len(self.codelists)} codelists>"
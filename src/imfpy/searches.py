@@ -1,12 +1,47 @@
 # -*- coding: utf-8 -*-
 
 #initialize a (very) simple caching mechanism for search results
-import pandas as pd, requests
+#pandas is imported inside the functions that need it, so importing searches stays fast
+import threading
+from collections import OrderedDict
+from imfpy import matching, snapshot, transport
 
-country_cache = pd.DataFrame()
-''' Cache for countries data '''
-database_cache = pd.DataFrame()
-''' Cache for databases data '''
+_country_cache = None
+_database_cache = None
+STRUCTURE_CACHE_SIZE = 32
+''' Maximum number of parsed DataStructure documents kept in memory '''
+_country_lock = threading.Lock()
+_database_lock = threading.Lock()
+_structure_cache = OrderedDict()
+_structure_lock = threading.Lock()
+_structure_flights = transport.SingleFlight()
+
+def __getattr__(name):
+    
+    #country_cache and database_cache hold the cached DataFrames (empty until retrieved)
+    #they are built on access so that importing searches does not import pandas
+    if name in ('country_cache', 'database_cache'):
+        cached = _country_cache if name == 'country_cache' else _database_cache
+        if cached is None:
+            import pandas as pd
+            cached = pd.DataFrame()
+        return cached
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def clear_cache():
+    
+    """
+    Empties the cached country and database codes and the parsed data structures,
+    so the next search retrieves them again.
+    """
+    
+    global _country_cache, _database_cache
+    with _country_lock:
+        _country_cache = None
+    with _database_lock:
+        _database_cache = None
+    with _structure_lock:
+        _structure_cache.clear()
 
 def country_search(keyword, regex = False):
     
@@ -42,24 +77,107 @@ def country_search(keyword, regex = False):
     #Input data types and values- validation
     assert isinstance(keyword, str),"Invalid inputs, please try again."
     
-    global country_cache
-    
-    if country_cache.empty:
-       #get full list of countries if cache is empty
-       codes = country_codes()   
-    else: 
-       #otherwise just access the cached countries
-        codes = country_cache
+    #get the full list of countries (cached after the first call)
+    codes = country_codes()
     
     #give the user the option to use regex to search if desired
-    if regex == False:
-        keyword = keyword.lower()
-        match = codes[codes['Country'].str.lower().str.contains(keyword, regex = False)]
-    else: 
-        match = codes[codes['Country'].str.contains(keyword, regex = True)]
+    #both are answered from a prebuilt index of the countries (see matching.SearchIndex)
+    match = matching.get_index('country', codes, 'Country').search(keyword, regex)
 
     return match
 
+def country_search_many(keywords, regex = False):
+    
+    """
+    Function to identify country codes and names for a whole list of keywords at once,
+    such as free-text country names from another dataset.
+    Each keyword is matched as in country_search, from the same prebuilt index, 
+    and repeated keywords are only looked up once.
+    
+    Parameters
+    ----------
+    keywords : list of str
+        The keywords or regular expressions to search. Not case-sensitive.
+    regex : bool (optional), default=False
+        Whether the keywords should be searched as regular expressions.
+        Defaults to False, in which case normal string matching is used.
+        
+    Returns
+    -------
+    match : pandas.core.frame.DataFrame
+        A DataFrame of matched results with one row per keyword and match, 
+        including the keyword, country code and country. Keywords without a match have no rows.
+    
+    Examples
+    --------
+    >>> searches.country_search_many(["germany", "korea", "cote d'ivoire"])
+    Returns the matches of each keyword, labelled by keyword
+    
+    """
+    
+    import pandas as pd
+    
+    #Input data types and values- validation
+    assert isinstance(keywords, (list, tuple, pd.Series)),"Invalid inputs, please try again."
+    assert all(isinstance(keyword, str) for keyword in keywords),"Invalid inputs, please try again."
+    
+    #get the full list of countries (cached after the first call)
+    codes = country_codes()
+    
+    return matching.get_index('country', codes, 'Country').search_many(list(keywords), regex)
+
+def country_resolve(keywords, limit = 1, cutoff = 80):
+    
+    """
+    Function to resolve messy country names (e.g. from reporting data) to IMF country codes.
+    Unlike country_search, matching is fuzzy and ranked: typos, word order and missing words
+    are tolerated ("Korea, Rep", "Turkiye"), and the best scoring countries are returned for each keyword.
+    Scores are computed with rapidfuzz when installed (pip install imfpy[fuzzy]), otherwise with difflib.
+    
+    Parameters
+    ----------
+    keywords : str or list of str
+        The country name(s) to resolve.
+    limit : int (optional), default=1
+        Maximum number of countries returned per keyword, best first.
+    cutoff : float (optional), default=80
+        Minimum score (0-100) of a returned country.
+        
+    Returns
+    -------
+    match : pandas.core.frame.DataFrame
+        A DataFrame of keyword, score (0-100), country code and country. 
+        Keywords without a country above the cutoff have one row with missing values,
+        so with limit=1 there is exactly one row per keyword, in order.
+    
+    Examples
+    --------
+    >>> searches.country_resolve(["Korea, Rep", "Turkiye", "Germnay"])
+    Returns the best matching country code for each name
+    
+    """
+    
+    keywords = _resolve_inputs(keywords, limit, cutoff)
+    
+    #get the full list of countries (cached after the first call)
+    codes = country_codes()
+    
+    return matching.get_index('country', codes, 'Country').resolve(keywords, limit, cutoff)
+
+def _resolve_inputs(keywords, limit, cutoff):
+    
+    """ Validates the inputs of the resolve functions, returning the keywords as a list """
+    
+    import pandas as pd
+    
+    if isinstance(keywords, str):
+        keywords = [keywords]
+    assert isinstance(keywords, (list, tuple, pd.Series)),"Invalid inputs, please try again."
+    assert all(isinstance(keyword, str) for keyword in keywords),"Invalid inputs, please try again."
+    assert isinstance(limit, int) and limit>0, "Invalid limit, please try again."
+    assert isinstance(cutoff, (int, float)) and 0<=cutoff<=100, "Invalid cutoff, please try again."
+    return list(keywords)
+
 def country_codes():
 
    """
@@ -84,35 +202,39 @@ def country_codes():
    
     
    #only request data if it hasn't been cached
-   global country_cache
+   global _country_cache
+   if _country_cache is not None:
+      return _country_cache
   
-   if country_cache.empty:
-      
-      #import libraries and define base URL for API
-      start_url = "http://dataservices.imf.org/REST/SDMX_JSON.svc/"
-      
-      # send the get request, use the DOTS database as the database_id
-      database_id = 'DOT' 
-      r = requests.get(f'{start_url}DataStructure/{database_id}')
-      print(r)
-      
-      # assert the response was 200 (OK)
-      assert r.status_code==200, "Error - HTTP request was unsuccessful."
-    
-      #convert the data to subscriptable json 
-      data_json = r.json()
-    
-      #get codelist (which contains countries)
-      country_codelist = data_json['Structure']['CodeLists']['CodeList'][2]['Code']
-    
-      #get list of countries and codes with a list comprehension
-      codes = [country['@value'] for country in country_codelist]
-      countries = [country['Description']['#text'] for country in country_codelist]
-      
-      #cache the result to avoid running it again
-      country_cache = pd.DataFrame({"Country Code": codes, "Country": countries})
+   #concurrent callers wait for a single request rather than each sending their own
+   with _country_lock:
+      #another thread may have filled the cache while this one waited
+      if _country_cache is None:
+         
+         #start from the codelist snapshot if there is one (refreshed in the background when stale)
+         #otherwise request the live codelist
+         codes = snapshot.frame('countries')
+         _country_cache = _fetch_country_codes() if codes is None else codes
   
-   return country_cache
+   return _country_cache
+
+def _fetch_country_codes():
+   
+   """ Requests the live list of countries and codes from the API """
+   
+   import pandas as pd
+   
+   # use the DOTS database as the database_id
+   # and keep the codelist of its reporting areas (which contains countries)
+   database_id = 'DOT' 
+   country_codelist = data_structure(database_id).codelist('REF_AREA')
+
+   #get list of countries and codes with a list comprehension
+   codes = [country['@value'] for country in country_codelist]
+   countries = [country['Description']['#text'] for country in country_codelist]
+
+   #build the dataframe of countries and codes
+   return pd.DataFrame({"Country Code": codes, "Country": countries})
 
 def database_codes():
     
@@ -137,41 +259,49 @@ def database_codes():
     """
     
     #only request data if it hasn't been cached
-    global database_cache
-    
-    if database_cache.empty:
-    
-        #define IMF data services API start point 
-        start_url = "http://dataservices.imf.org/REST/SDMX_JSON.svc"
-        
-        #requests.get the full list of databases, convert to json
-        import requests
-        r = requests.get(f'{start_url}/Dataflow')
-        print(r)
-        
-        #assert the response was 200 (OK)
-        assert r.status_code==200, "Error - HTTP request was unsuccessful."
-        
-        #convert the data to subscriptable json 
-        data_json = r.json()
-        
-        #convert results to dataframe
-        df_temp = pd.DataFrame(data_json['Structure']['Dataflows']['Dataflow']) 
-        
-        #parse out columns that themselves contain multiple cols of data
-        parsed_Name = pd.DataFrame([database['Name'] for database in data_json['Structure']['Dataflows']['Dataflow']])
-        parsed_KeyFamilyRef = pd.DataFrame([database['KeyFamilyRef'] for database in data_json['Structure']['Dataflows']['Dataflow']])
-        
-        #clean up dataframe columns
-        df_temp = df_temp.join(parsed_Name).join(parsed_KeyFamilyRef)[['@id', '#text']]
-        df_temp = df_temp.rename(columns={'@id': 'Database ID', '#text': 'Description'})
-        df_temp['Database ID'] = df_temp['Database ID'].str.replace("DS-","")
-        
-        #store clean dataframe to global cache
-        database_cache = df_temp.sort_values('Database ID').reset_index(drop=True)
+    global _database_cache
+    if _database_cache is not None:
+        return _database_cache
+    
+    #concurrent callers wait for a single request rather than each sending their own
+    with _database_lock:
+        #another thread may have filled the cache while this one waited
+        if _database_cache is None:
+            
+            #start from the codelist snapshot if there is one (refreshed in the background when stale)
+            #otherwise request the live list
+            codes = snapshot.frame('databases')
+            _database_cache = _fetch_database_codes() if codes is None else codes
         
     #return cache
-    return database_cache 
+    return _database_cache 
+
+def _fetch_database_codes():
+    
+    """ Requests the live list of databases and codes from the API """
+    
+    import pandas as pd
+    
+    #define IMF data services API start point 
+    start_url = transport.base_url()
+    
+    #requests.get the full list of databases, streamed out of the json
+    dataflows = list(transport.iter_items(f'{start_url}/Dataflow', 'Structure.Dataflows.Dataflow'))
+    
+    #convert results to dataframe
+    df_temp = pd.DataFrame(dataflows) 
+    
+    #parse out columns that themselves contain multiple cols of data
+    parsed_Name = pd.DataFrame([database['Name'] for database in dataflows])
+    parsed_KeyFamilyRef = pd.DataFrame([database['KeyFamilyRef'] for database in dataflows])
+    
+    #clean up dataframe columns
+    df_temp = df_temp.join(parsed_Name).join(parsed_KeyFamilyRef)[['@id', '#text']]
+    df_temp = df_temp.rename(columns={'@id': 'Database ID', '#text': 'Description'})
+    df_temp['Database ID'] = df_temp['Database ID'].str.replace("DS-","")
+    
+    #return clean dataframe, sorted by database
+    return df_temp.sort_values('Database ID').reset_index(drop=True)
 
 def database_search(keyword, regex = False):
     
@@ -206,24 +336,50 @@ def database_search(keyword, regex = False):
     #Input data types and values- validation
     assert isinstance(keyword, str),"Invalid inputs, please try again."
     
-    global database_cache
-    
-    if database_cache.empty:
-       #get full list of countries if cache is empty
-       codes = database_codes()  
-    else: 
-       #otherwise just access the cached countries
-        codes = database_cache
+    #get the full list of databases (cached after the first call)
+    codes = database_codes()
     
     #give the user the option to use regex to search if desired
-    if regex == False:
-        keyword = keyword.lower()
-        match = codes[codes['Description'].str.lower().str.contains(keyword, regex = False)]
-    else: 
-        match = codes[codes['Description'].str.contains(keyword, regex = True)]
+    #both are answered from a prebuilt index of the databases (see matching.SearchIndex)
+    match = matching.get_index('database', codes, 'Description').search(keyword, regex)
 
     return match
 
+def database_resolve(keywords, limit = 1, cutoff = 80):
+    
+    """
+    Function to resolve database names to IMF database codes with fuzzy, ranked matching
+    (see country_resolve), tolerating typos, word order and missing words.
+    
+    Parameters
+    ----------
+    keywords : str or list of str
+        The database name(s) to resolve.
+    limit : int (optional), default=1
+        Maximum number of databases returned per keyword, best first.
+    cutoff : float (optional), default=80
+        Minimum score (0-100) of a returned database.
+        
+    Returns
+    -------
+    match : pandas.core.frame.DataFrame
+        A DataFrame of keyword, score (0-100), database code and database.
+        Keywords without a database above the cutoff have one row with missing values.
+    
+    Examples
+    --------
+    >>> searches.database_resolve("Direction of Trade Statistcs")
+    Returns the best matching database ('DOT')
+    
+    """
+    
+    keywords = _resolve_inputs(keywords, limit, cutoff)
+    
+    #get the full list of databases (cached after the first call)
+    codes = database_codes()
+    
+    return matching.get_index('database', codes, 'Description').resolve(keywords, limit, cutoff)
+
 def database_info(database_id):
     
     """
@@ -248,34 +404,16 @@ def database_info(database_id):
     
     """
     
-    global database_cache
+    import pandas as pd
     
-    if database_cache.empty:
-       #get full list of countries if cache is empty
-       codes = database_codes()  
-    else: 
-       #otherwise just access the cached countries
-        codes = database_cache
+    #get the full list of databases (cached after the first call)
+    codes = database_codes()
         
     #check the database ID is valid before sending a request
     assert codes['Database ID'].str.fullmatch(database_id).any(), "Invalid database. Please try again."
     
-    #define IMF data services API start point 
-    start_url = "http://dataservices.imf.org/REST/SDMX_JSON.svc"
-        
-    #send the get request
-    import requests
-    r = requests.get(f'{start_url}/DataStructure/{database_id}')
-    print(r)
-    
-    #assert the response was 200 (OK)
-    assert r.status_code==200, "Error - HTTP request was unsuccessful."
-    
-    #convert the data to subscriptable json 
-    data_json = r.json()
-    
-    #get info from annotations
-    annotations_json = data_json['Structure']['KeyFamilies']['KeyFamily']['Annotations']['Annotation']
+    #take the annotations from the (shared) parsed data structure
+    annotations_json = data_structure(database_id).annotations
     
     #parse two columns: title and text
     titles = [annotation['AnnotationTitle'] for annotation in annotations_json]
@@ -314,33 +452,16 @@ def database_dimensions(database_id):
     
     """
     
-    global database_cache
+    import pandas as pd
     
-    if database_cache.empty:
-       #get full list of countries if cache is empty
-       codes = database_codes()  
-    else: 
-       #otherwise just access the cached countries
-        codes = database_cache
+    #get the full list of databases (cached after the first call)
+    codes = database_codes()
         
     #check the database ID is valid before sending a request
     assert codes['Database ID'].str.fullmatch(database_id).any(), "Invalid database. Please try again."
     
-    #define IMF data services API start point 
-    start_url = "http://dataservices.imf.org/REST/SDMX_JSON.svc"
-        
-    #send the get request
-    r = requests.get(f'{start_url}/DataStructure/{database_id}')
-    print(r)
-    
-    #assert the response was 200 (OK)
-    assert r.status_code==200, "Error - HTTP request was unsuccessful."
-    
-    #convert the data to subscriptable json 
-    data_json = r.json()
-    
-    #get info from KeyFamilies --> Components
-    dimensions_temp = data_json['Structure']['KeyFamilies']['KeyFamily']['Components']['Dimension']
+    #take KeyFamilies --> Components from the (shared) parsed data structure
+    dimensions_temp = data_structure(database_id).dimensions
     
     #return neat dataframe of database dimensions, dropping redundant columns
     dimensions_temp = pd.DataFrame(dimensions_temp)[['@conceptRef', '@conceptSchemeRef','@codelist']]
@@ -378,21 +499,21 @@ def indicator_dimensions(indicator_id):
     
     """
     
-    #define IMF data services API start point 
-    start_url = "http://dataservices.imf.org/REST/SDMX_JSON.svc"
-    
-    # pull the data 
-    r = requests.get(f'{start_url}/CodeList/{indicator_id}')
-    print(r)
+    import pandas as pd
     
-    #assert the response was 200 (OK)
-    assert r.status_code==200, "Error - HTTP request was unsuccessful."
+    #use the codelist if it came embedded in a data structure already retrieved
+    with _structure_lock:
+        embedded = [structure.codelists[indicator_id] for structure in _structure_cache.values()
+                    if indicator_id in structure.codelists]
     
-    #convert the data to subscriptable json 
-    data_json = r.json()
-
-    #get codelist for that indicator
-    codelist = data_json['Structure']['CodeLists']['CodeList']['Code']
+    if embedded:
+        codelist = embedded[0]
+    else:
+        #define IMF data services API start point 
+        start_url = transport.base_url()
+        
+        # pull the codelist for that indicator, streamed out of the json
+        codelist = list(transport.iter_items(f'{start_url}/CodeList/{indicator_id}', 'Structure.CodeLists.CodeList.Code'))
     
     #get list of codes and descriptions with a list comprehension
     codes = [code['@value'] for code in codelist]
@@ -405,3 +526,374 @@ def indicator_dimensions(indicator_id):
                          'Description':descriptions})
     return indicator_dimensions
 
+def data_structure(database_id):
+    
+    """
+    Returns the parsed DataStructure document of a database: its annotations, dimensions
+    and every codelist embedded in it. The document is requested and parsed once, then kept
+    in a least-recently-used cache of STRUCTURE_CACHE_SIZE databases shared by database_info,
+    database_dimensions, country_codes and indicator_dimensions.
+    
+    Parameters
+    ----------
+    database_id : str
+        The database ID of the database of interest.
+        
+    Returns
+    -------
+    structure : imfpy.sdmx.DataStructure
+        The parsed document, with annotations, dimensions and codelists attributes. Shared, so treat as read-only.
+    
+    Examples
+    --------
+    >>> searches.data_structure('FSI').codelists.keys()
+    Returns the IDs of the codelists embedded in the database 'FSI' (Financial Soundness Indicators)
+    
+    """
+    
+    from imfpy import sdmx
+    
+    with _structure_lock:
+        if database_id in _structure_cache:
+            _structure_cache.move_to_end(database_id)
+            return _structure_cache[database_id]
+    
+    def load():
+        #define IMF data services API start point 
+        start_url = transport.base_url()
+        
+        #send the get request and parse the parts of the document we use
+        structure = sdmx.DataStructure(database_id, transport.get_json(f'{start_url}/DataStructure/{database_id}'))
+        
+        #keep it, evicting the least recently used databases
+        with _structure_lock:
+            _structure_cache[database_id] = structure
+            while len(_structure_cache) > STRUCTURE_CACHE_SIZE:
+                _structure_cache.popitem(last=False)
+        return structure
+    
+    #concurrent first callers share a single request and parse
+    return _structure_flights.do(database_id, load)
+
+def indicator_resolve(indicator_id, keywords, limit = 1, cutoff = 80):
+    
+    """
+    Function to resolve series descriptions to the series IDs of an indicator with fuzzy, 
+    ranked matching (see country_resolve), tolerating typos, word order and missing words.
+    The indicator's dimensions are retrieved (see indicator_dimensions) and indexed once, then reused.
+    
+    Parameters
+    ----------
+    indicator_id : str
+        The indicator ID of the indicator of interest.
+    keywords : str or list of str
+        The series description(s) to resolve.
+    limit : int (optional), default=1
+        Maximum number of series returned per keyword, best first.
+    cutoff : float (optional), default=80
+        Minimum score (0-100) of a returned series.
+        
+    Returns
+    -------
+    match : pandas.core.frame.DataFrame
+        A DataFrame of keyword, score (0-100), indicator ID, series ID and description.
+        Keywords without a series above the cutoff have one row with missing values.
+    
+    Examples
+    --------
+    >>> searches.indicator_resolve('CL_INDICATOR_DOT', ["Goods, Value of Exports, FOB"])
+    Returns the best matching series ID ('TXG_FOB_USD')
+    
+    """
+    
+    keywords = _resolve_inputs(keywords, limit, cutoff)
+    
+    #index the indicator's dimensions the first time it is resolved
+    index = matching.get_index(f'indicator {indicator_id}')
+    if index is None:
+        index = matching.get_index(f'indicator {indicator_id}', indicator_dimensions(indicator_id), 'Description')
+    
+    return index.resolve(keywords, limit, cutoff)
+
+def catalog_search(keyword, database_id = None, limit = 100, path = None):
+    
+    """
+    Function to search every database, codelist and indicator series at once, offline,
+    in a local catalog built beforehand with `python -m imfpy.catalog build` (see catalog.build).
+    Every word of the keyword must appear in the code or description, and results are ranked by relevance.
+    
+    Parameters
+    ----------
+    keyword : str
+        The words to search. Not case or accent-sensitive, and words match as prefixes ("export" finds "exports").
+    database_id : str (optional), default=None
+        Only search this database and the codelists it uses.
+    limit : int (optional), default=100
+        Maximum number of matches returned.
+    path : str (optional), default=None
+        The catalog file. Defaults to the IMFPY_CATALOG environment variable, or ~/.cache/imfpy/catalog.sqlite.
+        
+    Returns
+    -------
+    match : pandas.core.frame.DataFrame
+        A DataFrame of matches, best first, with the kind of match (database, codelist or code),
+        database ID, indicator ID, series ID and description. 
+        Codes are listed once for each database using their codelist.
+    
+    Examples
+    --------
+    >>> searches.catalog_search("goods exports")
+    Returns series matching "goods" and "exports" across all databases
+    
+    >>> searches.catalog_search("germany", database_id="DOT")
+    Returns the codes for Germany used by the DOTS database
+    
+    """
+    
+    from imfpy import catalog
+    
+    #Input data types and values- validation
+    assert isinstance(keyword, str),"Invalid inputs, please try again."
+    assert isinstance(limit, int) and limit>0, "Invalid limit, please try again."
+    
+    return catalog.get_catalog(path).search(keyword, database_id, limit=limit)
+
+def catalog_dimensions(database_id, path = None):
+    
+    """
+    Offline version of database_dimensions, answered from a local catalog (see catalog_search).
+    
+    Parameters
+    ----------
+    database_id : str
+        The database ID of the database of interest.
+    path : str (optional), default=None
+        The catalog file. Defaults to the IMFPY_CATALOG environment variable, or ~/.cache/imfpy/catalog.sqlite.
+        
+    Returns
+    -------
+    dimensions : pandas.core.frame.DataFrame
+        A DataFrame of dimensions, as returned by database_dimensions.
+    
+    Examples
+    --------
+    >>> searches.catalog_dimensions('FSI')
+    Returns dimensions of the database 'FSI' without sending a request
+    
+    """
+    
+    from imfpy import catalog
+    
+    dimensions = catalog.get_catalog(path).dimensions(database_id)
+    assert not dimensions.empty, "Invalid database. Please try again."
+    return dimensions
+
+def catalog_indicator_dimensions(indicator_id, path = None):
+    
+    """
+    Offline version of indicator_dimensions, answered from a local catalog (see catalog_search).
+    
+    Parameters
+    ----------
+    indicator_id : str
+        The indicator ID of the indicator of interest.
+    path : str (optional), default=None
+        The catalog file. Defaults to the IMFPY_CATALOG environment variable, or ~/.cache/imfpy/catalog.sqlite.
+        
+    Returns
+    -------
+    indicator_dimensions : pandas.core.frame.DataFrame
+        A DataFrame of indicator dimensions, as returned by indicator_dimensions.
+    
+    Examples
+    --------
+    >>> searches.catalog_indicator_dimensions('CL_INDICATOR_FSI')
+    Returns indicator dimensions and series for 'CL_INDICATOR_FSI' without sending a request
+    
+    """
+    
+    from imfpy import catalog
+    
+    codes = catalog.get_catalog(path).codes(indicator_id)
+    assert not codes.empty, "Invalid indicator. Please try again."
+    return codes
+
+async def acountry_search(keyword, regex = False):
+    
+    """
+    Awaitable version of country_search for use inside an asyncio event loop.
+    Takes the same parameters and returns the same DataFrame as country_search.
+    
+    Examples
+    --------
+    >>> await searches.acountry_search("germany")
+    
+    """
+    
+    from imfpy import aio
+    return await aio.run(country_search, keyword, regex)
+
+async def acountry_search_many(keywords, regex = False):
+    
+    """
+    Awaitable version of country_search_many for use inside an asyncio event loop.
+    Takes the same parameters and returns the same DataFrame as country_search_many.
+    
+    Examples
+    --------
+    >>> await searches.acountry_search_many(["germany", "korea"])
+    
+    """
+    
+    from imfpy import aio
+    return await aio.run(country_search_many, keywords, regex)
+
+async def acountry_codes():
+    
+    """
+    Awaitable version of country_codes for use inside an asyncio event loop.
+    Takes the same parameters and returns the same DataFrame as country_codes.
+    
+    Examples
+    --------
+    >>> await searches.acountry_codes()
+    
+    """
+    
+    from imfpy import aio
+    return await aio.run(country_codes)
+
+async def adatabase_codes():
+    
+    """
+    Awaitable version of database_codes for use inside an asyncio event loop.
+    Takes the same parameters and returns the same DataFrame as database_codes.
+    
+    Examples
+    --------
+    >>> await searches.adatabase_codes()
+    
+    """
+    
+    from imfpy import aio
+    return await aio.run(database_codes)
+
+async def adatabase_search(keyword, regex = False):
+    
+    """
+    Awaitable version of database_search for use inside an asyncio event loop.
+    Takes the same parameters and returns the same DataFrame as database_search.
+    
+    Examples
+    --------
+    >>> await searches.adatabase_search("development")
+    
+    """
+    
+    from imfpy import aio
+    return await aio.run(database_search, keyword, regex)
+
+async def adatabase_info(database_id):
+    
+    """
+    Awaitable version of database_info for use inside an asyncio event loop.
+    Takes the same parameters and returns the same DataFrame as database_info.
+    
+    Examples
+    --------
+    >>> await searches.adatabase_info('FSI')
+    
+    """
+    
+    from imfpy import aio
+    return await aio.run(database_info, database_id)
+
+async def adatabase_dimensions(database_id):
+    
+    """
+    Awaitable version of database_dimensions for use inside an asyncio event loop.
+    Takes the same parameters and returns the same DataFrame as database_dimensions.
+    
+    Examples
+    --------
+    >>> await searches.adatabase_dimensions('FSI')
+    
+    """
+    
+    from imfpy import aio
+    return await aio.run(database_dimensions, database_id)
+
+async def adata_structure(database_id):
+    
+    """
+    Awaitable version of data_structure for use inside an asyncio event loop.
+    Takes the same parameters and returns the same DataStructure as data_structure.
+    
+    Examples
+    --------
+    >>> await searches.adata_structure('FSI')
+    
+    """
+    
+    from imfpy import aio
+    return await aio.run(data_structure, database_id)
+
+async def aindicator_dimensions(indicator_id):
+    
+    """
+    Awaitable version of indicator_dimensions for use inside an asyncio event loop.
+    Takes the same parameters and returns the same DataFrame as indicator_dimensions.
+    
+    Examples
+    --------
+    >>> await searches.aindicator_dimensions('CL_INDICATOR_FSI')
+    
+    """
+    
+    from imfpy import aio
+    return await aio.run(indicator_dimensions, indicator_id)
+
+async def acountry_resolve(keywords, limit = 1, cutoff = 80):
+    
+    """
+    Awaitable version of country_resolve for use inside an asyncio event loop.
+    Takes the same parameters and returns the same DataFrame as country_resolve.
+    
+    Examples
+    --------
+    >>> await searches.acountry_resolve(["Korea, Rep", "Turkiye"])
+    
+    """
+    
+    from imfpy import aio
+    return await aio.run(country_resolve, keywords, limit, cutoff)
+
+async def adatabase_resolve(keywords, limit = 1, cutoff = 80):
+    
+    """
+    Awaitable version of database_resolve for use inside an asyncio event loop.
+    Takes the same parameters and returns the same DataFrame as database_resolve.
+    
+    Examples
+    --------
+    >>> await searches.adatabase_resolve("Direction of Trade Statistcs")
+    
+    """
+    
+    from imfpy import aio
+    return await aio.run(database_resolve, keywords, limit, cutoff)
+
+async def aindicator_resolve(indicator_id, keywords, limit = 1, cutoff = 80):
+    
+    """
+    Awaitable version of indicator_resolve for use inside an asyncio event loop.
+    Takes the same parameters and returns the same DataFrame as indicator_resolve.
+    
+    Examples
+    --------
+    >>> await searches.aindicator_resolve('CL_INDICATOR_DOT', ["Goods, Value of Exports, FOB"])
+    
+    """
+    
+    from imfpy import aio
+    return await aio.run(indicator_resolve, indicator_id, keywords, limit, cutoff)
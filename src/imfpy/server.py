@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+#local stand-in for the IMF SDMX JSON API, serving recorded fixtures for offline tests and benchmarks
+import random, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+GARBLED_LENGTH = 16
+''' Number of bytes of the body sent in garbled responses, few enough that no item can be decoded from them '''
+
+class SDMXServer:
+
+    """
+    A small HTTP server answering SDMX JSON API requests from recorded fixtures (see fixtures.record),
+    with configurable latency, throttling and errors so clients can be tested and benchmarked offline.
+    Requests are looked up by path and query, so point imfpy at it with transport.set_base_url(server.url).
+    Requests that were not recorded are answered 400, like the IMF answers invalid requests.
+
+    Parameters
+    ----------
+    path : str or FixtureStore
+        Directory holding the fixtures.
+    latency : float (optional), default=0
+        Seconds to wait before answering each request.
+    rate : float (optional), default=None
+        Requests per second allowed (bursts of up to burst requests), beyond which requests are answered 429
+        with a Retry-After header giving the time until the next request is allowed. Defaults to no limit.
+    burst : int (optional), default=10
+        Number of requests that may arrive at once before the rate applies.
+    error_rate : float (optional), default=0
+        Share of requests answered 503 (Service Unavailable).
+    garble_rate : float (optional), default=0
+        Share of requests answered 200 with an invalid JSON body, cut off after its first GARBLED_LENGTH bytes.
+    retry_after : float (optional), default=1
+        Seconds sent in the Retry-After header of 503 responses.
+    seed : int (optional), default=None
+        Seed of the random errors, for reproducible runs.
+    host : str (optional), default='127.0.0.1'
+    port : int (optional), default=0
+        Port to listen on. Defaults to any free port.
+
+    Examples
+    --------
+    >>> with server.SDMXServer('tests/fixtures', latency=0.05, error_rate=0.1) as local:
+    ...     transport.set_base_url(local.url)
+    ...     retrievals.dots('US', ['GB', 'FR'], 2000, 2005)
+    Retrieves recorded data through a slow and unreliable local server
+
+    """
+
+    def __init__(self, path, latency=0.0, rate=None, burst=10, error_rate=0.0, garble_rate=0.0,
+                 retry_after=1.0, seed=None, host='127.0.0.1', port=0):
+        from imfpy.fixtures import FixtureStore
+
+        assert latency >= 0 and 0 <= error_rate <= 1 and 0 <= garble_rate <= 1, "Invalid inputs, please try again."
+        assert rate is None or rate > 0, "rate must be positive"
+        self.fixtures = path if isinstance(path, FixtureStore) else FixtureStore(path)
+        self.latency, self.rate, self.burst = latency, rate, burst
+        self.error_rate, self.garble_rate, self.retry_after = error_rate, garble_rate, retry_after
+        self.counts = {'requests': 0, 200: 0, 400: 0, 429: 0, 503: 0, 'garbled': 0}
+        self._random = random.Random(seed)
+        self._tokens, self._last = float(burst), time.monotonic()
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+
+        """ The base URL of the server, such as 'http://127.0.0.1:8000' """
+
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def _decide(self):
+
+        #pick the fate of a request (throttled, failed, garbled or answered) and the Retry-After to send
+        with self._lock:
+            self.counts['requests'] += 1
+            if self.rate is not None:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens < 1:
+                    return 429, (1 - self._tokens) / self.rate
+                self._tokens -= 1
+            draw = self._random.random()
+            if draw < self.error_rate:
+                return 503, self.retry_after
+            if draw < self.error_rate + self.garble_rate:
+                return 'garbled', None
+            return 200, None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency)
+                fate, retry_after = server._decide()
+                content = server.fixtures.load(self.path.lstrip('/')) if fate in (200, 'garbled') else None
+                if fate in (200, 'garbled') and content is None:
+                    fate = 400
+                if fate == 'garbled':
+                    content, fate = content[:GARBLED_LENGTH], 200
+                    with server._lock:
+                        server.counts['garbled'] += 1
+                with server._lock:
+                    server.counts[fate] += 1
+
+                self.send_response(fate)
+                if retry_after is not None:
+                    self.send_header('Retry-After', f'{retry_after:.3f}')
+                body = content if fate == 200 else b'{}'
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+
+        """ Starts answering requests in a background thread, and returns the server """
+
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._httpd.serve_forever, name='imfpy-sdmx-server', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+
+        """ Stops the server and frees its port """
+
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def main(argv=None):
+
+    """
+    Command line entry point.
+
+    Examples
+    --------
+    $ python -m imfpy.server tests/fixtures --port 8000 --latency 0.05 --error-rate 0.1
+    Serves the fixtures at http://127.0.0.1:8000 until interrupted (set IMFPY_BASE_URL to use it)
+
+    """
+
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='python -m imfpy.server', description='Serve recorded IMF API responses locally.')
+    parser.add_argument('path', help='directory of recorded fixtures')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds to wait before each answer')
+    parser.add_argument('--rate', type=float, default=None, help='requests per second before answering 429')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests answered 503')
+    parser.add_argument('--garble-rate', type=float, default=0.0, help='share of requests answered with broken JSON')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    local = SDMXServer(args.path, args.latency, args.rate, error_rate=args.error_rate, garble_rate=args.garble_rate,
+                       seed=args.seed, host=args.host, port=args.port)
+    print(f"Serving {len(local.fixtures.keys())} recorded responses at {local.url}")
+    try:
+        local._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        local._httpd.server_close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+
+#snapshot of the country and database codelists, so searches can answer without a request on startup
+import os, threading, time
+
+FORMAT = 1
+''' Version of the snapshot file format '''
+MAX_AGE = 7*24*60*60
+''' Age (in seconds) after which a snapshot is refreshed from the live API in the background '''
+
+_enabled = os.environ.get('IMFPY_SNAPSHOT', '1') != '0'
+_loaded = None
+_refresher = None
+_lock = threading.Lock()
+
+def user_path():
+
+    """
+    Returns where snapshots are saved and read: in the IMFPY_CACHE_DIR directory,
+    or in the directory of the on-disk cache when it is enabled (see cache.enable).
+    Returns None if neither is set, in which case no snapshot is used and searches request the live codelists.
+    """
+
+    from imfpy import cache
+
+    directory = os.environ.get('IMFPY_CACHE_DIR')
+    if not directory and cache.get_cache() is not None:
+        directory = cache.get_cache().path
+    return os.path.abspath(os.path.expanduser(os.path.join(directory, 'codelists.json'))) if directory else None
+
+def enable():
+
+    """ Lets searches start from the snapshot (the default, unless IMFPY_SNAPSHOT=0 is set) """
+
+    global _enabled
+    _enabled = True
+
+def disable():
+
+    """ Makes searches request the live codelists instead of using the snapshot """
+
+    global _enabled
+    _enabled = False
+
+def build(path=None):
+
+    """
+    Requests the live country and database codelists and writes them to a snapshot file.
+
+    Parameters
+    ----------
+    path : str (optional), default=None
+        The file to write. Defaults to user_path().
+
+    Returns
+    -------
+    snapshot : dict
+        The snapshot written, with format, created (seconds since the epoch), countries and databases.
+
+    Examples
+    --------
+    >>> snapshot.build('/tmp/imf/codelists.json')
+    Writes a fresh snapshot to /tmp/imf/codelists.json
+
+    """
+
+    path = path or user_path()
+    assert path is not None, "No snapshot path given. Please pass a path, or set IMFPY_CACHE_DIR."
+    data = _fetch()
+    _write(data, path)
+    return data
+
+def _fetch():
+
+    #request the live codelists, in the form of a snapshot
+    from imfpy import searches
+
+    countries, databases = searches._fetch_country_codes(), searches._fetch_database_codes()
+    return {'format': FORMAT, 'created': time.time(),
+            'countries': countries.to_dict(orient='list'),
+            'databases': databases.to_dict(orient='list')}
+
+def _write(data, path):
+
+    import json
+
+    #write to a temporary file first so readers never see a partial snapshot
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(temp, 'w', encoding='utf-8') as file:
+        json.dump(data, file, ensure_ascii=False, separators=(',', ':'))
+    os.replace(temp, path)
+
+def load():
+
+    """
+    Returns the snapshot saved at user_path(), or None.
+    The snapshot is read once per process.
+    """
+
+    import json
+
+    global _loaded
+
+    with _lock:
+        if _loaded is None:
+            path, data = user_path(), None
+            if path is not None:
+                try:
+                    with open(path, encoding='utf-8') as file:
+                        data = json.load(file)
+                except (OSError, ValueError):
+                    pass
+            _loaded = data if isinstance(data, dict) and data.get('format') == FORMAT else False
+        return _loaded or None
+
+def frame(name):
+
+    """
+    Returns the 'countries' or 'databases' codelist from the snapshot as a DataFrame,
+    in the same form as searches.country_codes and database_codes, or None if there is nowhere to save one
+    (or it is disabled). The first call with no snapshot saved requests both codelists and saves them,
+    so later processes start from the snapshot. A stale snapshot is still returned, and a refresh is started in the background.
+    """
+
+    import pandas as pd
+
+    global _loaded
+
+    if not _enabled:
+        return None
+    data = load()
+    if data is None:
+        path = user_path()
+        if path is None:
+            return None
+        data = _fetch()
+        with _lock:
+            _loaded = data
+        try:
+            _write(data, path)
+        except OSError:
+            pass
+        return pd.DataFrame(data[name])
+    if time.time() - data['created'] > MAX_AGE:
+        refresh()
+    return pd.DataFrame(data[name])
+
+def refresh():
+
+    """
+    Starts refreshing the snapshot from the live API in a background thread, unless one is running.
+    When done, the refreshed snapshot replaces the codelists cached by searches,
+    and is saved to user_path() for later processes.
+    Failures leave the current snapshot in use.
+
+    Returns
+    -------
+    thread : threading.Thread
+        The refreshing thread, which can be joined to wait for it.
+
+    """
+
+    global _refresher
+
+    with _lock:
+        if _refresher is None or not _refresher.is_alive():
+            _refresher = threading.Thread(target=_refresh, name='imfpy-snapshot-refresh', daemon=True)
+            _refresher.start()
+        return _refresher
+
+def _refresh():
+
+    import pandas as pd
+    from imfpy import searches
+
+    global _loaded
+
+    try:
+        data = _fetch()
+    except Exception:
+        return
+    with _lock:
+        _loaded = data
+
+    #nothing is written to disk unless the user chose a cache directory
+    path = user_path()
+    if path is not None:
+        try:
+            _write(data, path)
+        except OSError:
+            pass
+
+    #swap the fresh codelists in, unless the caches are empty (they will be filled from the new snapshot)
+    with searches._country_lock:
+        if searches._country_cache is not None:
+            searches._country_cache = pd.DataFrame(data['countries'])
+    with searches._database_lock:
+        if searches._database_cache is not None:
+            searches._database_cache = pd.DataFrame(data['databases'])
+
+def main(argv=None):
+
+    """
+    Command line entry point: `python -m imfpy.snapshot [path]` writes a fresh snapshot,
+    to user_path() by default.
+    """
+
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='python -m imfpy.snapshot', description='Write a snapshot of the IMF country and database codelists.')
+    parser.add_argument('path', nargs='?', default=None, help='file to write (default: codelists.json in IMFPY_CACHE_DIR)')
+    args = parser.parse_args(argv)
+    path = args.path or user_path()
+    if path is None:
+        parser.error('no path given and IMFPY_CACHE_DIR is not set')
+    data = build(path)
+    print(f"Snapshot of {len(data['countries']['Country Code'])} countries and "
+          f"{len(data['databases']['Database ID'])} databases written to {path}")
+
+if __name__ == '__main__':
+    main()
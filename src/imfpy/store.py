@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+
+#local columnar store of series retrieved by retrievals.dots, partitioned by freq/country/counterpart
+import os, threading
+
+VALUES = ['Exports', 'Imports', 'Trade Balance', 'Twoway Trade']
+''' Value columns kept for each series '''
+
+class DotsStore:
+    
+    """
+    A local dataset of DOTS series in Parquet (or Feather) files, one file per
+    frequency, country and counterpart, laid out as freq=A/country=US/counterpart=CN/.
+    Queries shaped like retrievals.dots are answered from disk, with the period and
+    counterpart filters pushed down to the files. Requires pyarrow.
+    
+    Parameters
+    ----------
+    path : str
+        Root directory of the dataset. Created if it does not exist.
+    format : str (optional), default='parquet'
+        File format, 'parquet' or 'feather'.
+    
+    Examples
+    --------
+    >>> store = DotsStore('~/imf/dots')
+    >>> store.write(dots('US', ['CN', 'MX'], 1990, 2020, freq='M'))
+    >>> store.read('US', 'CN', 2000, 2010, freq='M')
+    Returns US-China monthly data between 2000 and 2010 from the local store.
+    
+    """
+    
+    def __init__(self, path, format='parquet'):
+        assert format in ['parquet', 'feather'], "format must be parquet or feather"
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.format = format
+        self._lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+    
+    def _file(self, freq, country, counterpart):
+        return os.path.join(self.path, f'freq={freq}', f'country={country}', f'counterpart={counterpart}',
+                            f'part-0.{self.format}')
+    
+    def _partitioning(self):
+        import pyarrow as pa, pyarrow.dataset as ds
+        return ds.partitioning(pa.schema([('freq', pa.string()), ('country', pa.string()), ('counterpart', pa.string())]),
+                               flavor='hive')
+    
+    def write(self, dots_dataframe):
+        
+        """
+        Writes a DataFrame returned by retrievals.dots (long or wide form) to the store.
+        Periods already stored for the same series are replaced, other periods are kept.
+        
+        Parameters
+        ----------
+        dots_dataframe : pandas.core.frame.DataFrame
+            A DataFrame returned by retrievals.dots or retrievals.refresh.
+        
+        """
+        
+        import pandas as pd
+        import pyarrow as pa
+        from imfpy.retrievals import _to_long
+        
+        assert isinstance(dots_dataframe, pd.DataFrame), "dots_dataframe must be a DataFrame"
+        long_df = _to_long(dots_dataframe) if isinstance(dots_dataframe.columns, pd.MultiIndex) else dots_dataframe
+        try:
+            periods = long_df.Period.astype(str)
+            country = long_df.Country.unique()[0]
+        except AttributeError:
+            raise AssertionError("Wrong data form. Please enter a DataFrame returned by retrievals.dots.")
+        freq = "A" if periods.str.len().max()==4 else "M"
+        
+        with self._lock:
+            for counterpart, group in long_df.groupby('Counterpart', sort=False):
+                new = group[['Period'] + VALUES].assign(Period=group.Period.astype(str))
+                file = self._file(freq, country, counterpart)
+                
+                #merge with the periods already stored, new values win
+                if os.path.exists(file):
+                    new = pd.concat([self._read_file(file), new])
+                    new = new.drop_duplicates('Period', keep='last')
+                new = new.sort_values('Period').reset_index(drop=True)
+                
+                #write to a temporary file first so readers never see a partial file
+                #its name starts with a dot, so datasets skip it (even one left behind by a crash) without opening it
+                os.makedirs(os.path.dirname(file), exist_ok=True)
+                temp = os.path.join(os.path.dirname(file), f'.{os.path.basename(file)}.{os.getpid()}.tmp')
+                table = pa.Table.from_pandas(new, preserve_index=False)
+                if self.format == 'parquet':
+                    import pyarrow.parquet as pq
+                    pq.write_table(table, temp)
+                else:
+                    import pyarrow.feather as feather
+                    feather.write_feather(table, temp)
+                os.replace(temp, file)
+    
+    def _read_file(self, file):
+        if self.format == 'parquet':
+            import pyarrow.parquet as pq
+            return pq.read_table(file).to_pandas()
+        import pyarrow.feather as feather
+        return feather.read_table(file).to_pandas()
+    
+    def read(self, country, counterparts, start, end, freq='A', form='wide'):
+        
+        """
+        Answers a retrievals.dots query from the store, without sending any request.
+        Takes the same parameters and returns the same DataFrame shape as dots.
+        
+        Returns
+        -------
+        full_df : pandas.core.frame.DataFrame
+            DataFrame with trade statistics, long or wide form as in dots.
+        
+        Examples
+        --------
+        >>> store.read("GR", ["US", "AU", "DE"], 1998, 2018)
+        Returns wide-form Greece annual data vs. the U.S., Australia and Germany from the store.
+        
+        """
+        
+        import pandas as pd
+        import pyarrow.dataset as ds
+        from imfpy.retrievals import _format_month, _to_month, _to_wide, _window
+        
+        #validate input datatypes
+        assert isinstance(country, str), "country must be a str"
+        assert isinstance(counterparts, (str, list)), "counterparts must be a str or list"
+        assert freq=="M" or freq=="A", "frequency must be M or A"
+        assert form in ['long', 'wide'], "form must be long or wide"
+        start, end = _window(start, end, freq)
+        
+        requested = [counterparts] if isinstance(counterparts, str) else counterparts
+        low = _format_month(_to_month(start, freq, False), freq)
+        high = _format_month(_to_month(end, freq, True), freq)
+        
+        #push the partition and period filters down to the files
+        dataset = ds.dataset(self.path, format='ipc' if self.format == 'feather' else 'parquet',
+                             partitioning=self._partitioning())
+        condition = ((ds.field('freq') == freq) & (ds.field('country') == country)
+                     & ds.field('counterpart').isin(list(set(requested)))
+                     & (ds.field('Period') >= low) & (ds.field('Period') <= high))
+        table = dataset.to_table(columns=['counterpart', 'Period'] + VALUES, filter=condition).to_pandas()
+        
+        #shape the result like dots
+        frames = []
+        for counterpart in requested:
+            frame = table[table.counterpart == counterpart].drop(columns='counterpart')
+            assert not frame.empty, f"No data for {country}-{counterpart} in the store. Please try again."
+            frame = frame.sort_values('Period').reset_index(drop=True)
+            frame.insert(1, 'Country', country)
+            frame.insert(2, 'Counterpart', counterpart)
+            frames.append(frame)
+        full_df = pd.concat(frames)
+        
+        if isinstance(counterparts, list) and form == "wide":
+            full_df = _to_wide(full_df, country)
+        return full_df
@@ -0,0 +1,702 @@
+# -*- coding: utf-8 -*-
+
+#single entry point through which retrievals and searches send requests to the API
+import math, os, random, sys, threading, time
+from imfpy import events
+
+BASE_URL = "http://dataservices.imf.org/REST/SDMX_JSON.svc"
+''' Default address of the IMF SDMX JSON API, overridden by the IMFPY_BASE_URL environment variable '''
+TIMEOUT = (10, 120)
+''' Default (connect, read) timeouts of a request, in seconds '''
+POOL_SIZE = 16
+''' Default maximum number of keep-alive connections kept open per host '''
+JSON_BACKENDS = ['orjson', 'ujson', 'json']
+''' JSON decoders in order of preference, the standard library json is always available '''
+RATE = 2.0
+''' Initial number of requests per second allowed by the rate limiter, with BURST the 10 requests per 5 seconds the IMF asks clients to keep to '''
+BURST = 10
+''' Number of requests that may be sent at once before the rate limit applies '''
+MIN_RATE = 0.2
+''' Lowest rate (requests per second) the limiter slows down to when throttled '''
+MAX_RATE = 10.0
+''' Highest rate (requests per second) the limiter speeds up to while requests succeed '''
+RETRIES = 3
+''' Number of times a throttled, failed or garbled request is retried '''
+BACKOFF = 0.5
+''' Base delay (in seconds) before a retry, doubled after each failed attempt and jittered '''
+MAX_BACKOFF = 30.0
+''' Longest delay (in seconds) before a retry '''
+
+_transport = None
+_base_url = os.environ.get('IMFPY_BASE_URL') or BASE_URL
+_lock = threading.Lock()
+_loads = None
+_backend = None
+
+def base_url():
+    
+    """ Returns the address (without a trailing slash) that retrievals and searches send requests to """
+    
+    return _base_url
+
+def set_base_url(url=None):
+    
+    """
+    Points every request at another server speaking the IMF SDMX JSON API,
+    such as a mirror or a local stand-in server (see server.SDMXServer).
+    
+    Parameters
+    ----------
+    url : str (optional), default=None
+        The address of the API, such as 'http://127.0.0.1:8000'. Defaults to BASE_URL.
+    
+    Examples
+    --------
+    >>> transport.set_base_url('http://127.0.0.1:8000')
+    Sends requests to a server running locally.
+    
+    """
+    
+    global _base_url
+    
+    assert url is None or isinstance(url, str), "url must be a str"
+    _base_url = (url or BASE_URL).rstrip('/')
+
+def url_key(url):
+    
+    """ Returns the part of url after the base URL, such as 'Dataflow' (or url itself if it is elsewhere) """
+    
+    base = _base_url + '/'
+    return url[len(base):] if url.startswith(base) else url
+
+def _report(url, status, size, started, retries, cache):
+    
+    #emit an HTTPEvent for a response body, unless nobody listens
+    if events.active():
+        key = url_key(url)
+        endpoint = key.split('?', 1)[0].split('/', 1)[0]
+        events.emit(events.HTTPEvent(key, endpoint, status, size, time.perf_counter() - started, retries, cache))
+
+def set_json_backend(backend='auto'):
+    
+    """
+    Chooses the decoder used for JSON responses.
+    
+    Parameters
+    ----------
+    backend : str (optional), default='auto'
+        One of 'orjson', 'ujson' or 'json' (the standard library).
+        'auto' uses the fastest one installed, falling back to 'json'.
+        
+    Returns
+    -------
+    backend : str
+        The name of the decoder now in use.
+    
+    Examples
+    --------
+    >>> transport.set_json_backend('json')
+    Decodes responses with the standard library only.
+    
+    """
+    
+    assert backend == 'auto' or backend in JSON_BACKENDS, f"backend must be 'auto' or one of {JSON_BACKENDS}"
+    
+    global _loads, _backend
+    
+    import importlib
+    for name in (JSON_BACKENDS if backend == 'auto' else [backend]):
+        try:
+            module = importlib.import_module(name)
+        except ImportError:
+            continue
+        _loads, _backend = module.loads, name
+        return name
+    raise AssertionError(f"JSON backend {backend} is not installed.")
+
+def json_backend():
+    
+    """ Returns the name of the decoder used for JSON responses """
+    
+    if _loads is None:
+        set_json_backend()
+    return _backend
+
+def loads(content):
+    
+    """ Decodes a JSON response body (bytes) with the chosen decoder """
+    
+    if _loads is None:
+        set_json_backend()
+    return _loads(content)
+
+class SingleFlight:
+    
+    """
+    Lets concurrent identical calls share one execution and its result.
+    The first caller for a key runs the call, later callers with the same key
+    wait for it and receive the same result (or exception) instead of running it again.
+    
+    Examples
+    --------
+    >>> flights = SingleFlight()
+    >>> flights.do(url, lambda: requests.get(url).json())
+    Threads asking for the same url at the same moment share one request.
+    
+    """
+    
+    class _Call:
+        __slots__ = ('key', 'event', 'ok', 'result', 'error')
+        def __init__(self, key):
+            self.key, self.event = key, threading.Event()
+            self.ok, self.result, self.error = False, None, None
+    
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+    
+    def join(self, key):
+        
+        """ Returns the call in flight for key and whether the caller leads it (and must finish it) """
+        
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                return call, False
+            call = self._calls[key] = self._Call(key)
+            return call, True
+    
+    def finish(self, call, result=None, ok=False, error=None):
+        
+        """
+        Completes a call led by the caller, waking every caller waiting on it.
+        Waiting callers get result if ok, error if given, and otherwise run the call themselves.
+        """
+        
+        with self._lock:
+            if self._calls.get(call.key) is call:
+                del self._calls[call.key]
+        call.ok, call.result, call.error = ok, result, error
+        call.event.set()
+    
+    def wait(self, call, fn):
+        
+        """ Waits for a call led by another caller and returns its result, running fn if it gave none """
+        
+        call.event.wait()
+        if call.ok:
+            return call.result
+        if call.error is not None:
+            raise call.error
+        return fn()
+    
+    def do(self, key, fn):
+        
+        """ Runs fn, unless a call with the same key is in flight, in which case its result is shared """
+        
+        call, leader = self.join(key)
+        if not leader:
+            return self.wait(call, fn)
+        try:
+            result = fn()
+        except Exception as e:
+            self.finish(call, error=e)
+            raise
+        except BaseException:
+            self.finish(call)
+            raise
+        self.finish(call, result, ok=True)
+        return result
+
+class _Recorder:
+    
+    """
+    Wraps a response stream, counting the bytes read. If a follower asks for the body (see keep)
+    before reading starts, a copy of everything read is kept so it can be shared once complete.
+    """
+    
+    def __init__(self, raw=None):
+        self.raw, self.chunks, self.started, self.bytes = raw, None, False, 0
+        self._lock = threading.Lock()
+    
+    def keep(self):
+        
+        """ Starts keeping the body unless reading has started, and returns whether it is kept """
+        
+        with self._lock:
+            if self.chunks is None and not self.started:
+                self.chunks = []
+            return self.chunks is not None
+    
+    def read(self, size=-1):
+        with self._lock:
+            self.started = True
+        data = self.raw.read(size)
+        self.bytes += len(data)
+        if self.chunks is not None:
+            self.chunks.append(data)
+        return data
+    
+    def getvalue(self):
+        #the parser may stop before the end of the body
+        self.read()
+        return b''.join(self.chunks)
+    
+    def size(self):
+        return self.bytes
+
+class RateLimiter:
+    
+    """
+    A token bucket shared by every request sent through a Transport.
+    The rate adapts to the server: it is halved whenever a request is throttled
+    (429, 5xx, dropped connections or garbled JSON) and creeps back up while requests succeed.
+    
+    The defaults start at the limit the IMF publishes for its API, and only climb towards MAX_RATE
+    while the server keeps answering. Past that limit the API answers with broken JSON rather than 429,
+    so bulk jobs gain more from fewer, larger requests (dots joins up to BATCH_SIZE counterparts per request)
+    than from a higher rate. Raise rate and max_rate for a mirror or a local server.
+    
+    Parameters
+    ----------
+    rate : float (optional), default=RATE
+        Initial number of requests per second.
+    burst : int (optional), default=BURST
+        Number of requests that may be sent at once.
+    min_rate : float (optional), default=MIN_RATE
+        Lowest rate the limiter slows down to.
+    max_rate : float (optional), default=MAX_RATE
+        Highest rate the limiter speeds up to.
+    
+    """
+    
+    def __init__(self, rate=RATE, burst=BURST, min_rate=MIN_RATE, max_rate=MAX_RATE):
+        assert 0 < min_rate <= rate <= max_rate, "rates must satisfy 0 < min_rate <= rate <= max_rate"
+        assert isinstance(burst, int) and burst > 0, "burst must be a positive int"
+        self.rate = float(rate)
+        self.burst = burst
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate)
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        
+        """ Blocks until a request may be sent """
+        
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            #take a token, waiting for it to refill if the bucket is empty
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+    
+    def throttled(self):
+        
+        """ Halves the rate after the server pushed back """
+        
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0)
+    
+    def succeeded(self):
+        
+        """ Raises the rate a little after a successful request """
+        
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + 0.1)
+
+class Transport:
+    
+    """
+    Sends requests to the IMF JSON RESTful API over a pooled, keep-alive HTTP session.
+    Responses are compressed (gzip) on the wire and every request is subject to a timeout.
+    Requests pass through an adaptive rate limiter, and are retried with jittered
+    exponential backoff when the server throttles (429), fails (5xx), drops the connection
+    or returns broken JSON. Identical requests in flight at the same time from several
+    threads share one network call and one decoded payload (treat payloads as read-only).
+    Subclass and override get to plug in a different HTTP client.
+    
+    Parameters
+    ----------
+    timeout : float or tuple (optional), default=TIMEOUT
+        Seconds to wait for the server, either one number or a (connect, read) tuple.
+    pool_size : int (optional), default=POOL_SIZE
+        Maximum number of keep-alive connections kept open per host.
+    headers : dict (optional), default=None
+        Extra headers sent with every request.
+    stream : bool (optional), default=False
+        Whether iter_items parses responses incrementally with ijson (lower peak memory on large payloads)
+        rather than decoding them whole with the JSON backend (several times faster, see set_json_backend).
+        Streaming needs ijson (pip install imfpy[stream]), otherwise responses are decoded whole.
+    limiter : RateLimiter (optional), default=None
+        The rate limiter requests wait on. Defaults to a new RateLimiter().
+    retries : int (optional), default=RETRIES
+        Number of times a throttled, failed or garbled request is retried.
+    
+    Examples
+    --------
+    >>> transport.set_transport(transport.Transport(timeout=30, pool_size=64))
+    Sends every request through a larger connection pool with a 30 second timeout.
+    
+    """
+    
+    def __init__(self, timeout=TIMEOUT, pool_size=POOL_SIZE, headers=None, stream=False, limiter=None, retries=RETRIES):
+        assert isinstance(pool_size, int) and pool_size > 0, "pool_size must be a positive int"
+        assert isinstance(retries, int) and retries >= 0, "retries must be a non-negative int"
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.headers = {'Accept': 'application/json',
+                        'Accept-Encoding': 'gzip, deflate',
+                        'Connection': 'keep-alive'}
+        self.headers.update(headers or {})
+        self.stream = stream
+        self.limiter = RateLimiter() if limiter is None else limiter
+        self.retries = retries
+        self._flights = SingleFlight()
+        self._streams = {}
+        self._session = None
+        self._lock = threading.Lock()
+    
+    @property
+    def session(self):
+        
+        """ The pooled requests.Session, created on first use """
+        
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    session.headers.update(self.headers)
+                    self._session = session
+        return self._session
+    
+    def get(self, url, stream=False):
+        
+        """ Sends a get request and returns the requests.Response """
+        
+        return self.session.get(url, timeout=self.timeout, stream=stream)
+    
+    def _backoff(self, attempt, retry_after=None):
+        
+        """
+        Sleeps before retrying, honouring the server's Retry-After header if it sent a number of seconds.
+        Anything else (an HTTP date, garbage, NaN or infinity) falls back to the jittered exponential backoff.
+        """
+        
+        try:
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            delay = None
+        if delay is None or not math.isfinite(delay):
+            delay = min(MAX_BACKOFF, BACKOFF * 2**attempt) * random.uniform(0.5, 1.5)
+        time.sleep(min(MAX_BACKOFF, max(0.0, delay)))
+    
+    def _send(self, url, stream=False):
+        
+        """ Sends a get request, retrying throttled and failed attempts, and asserts that it was successful """
+        
+        import requests
+        
+        started = time.perf_counter()
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            self.limiter.acquire()
+            
+            #send the get request, dropped connections are retried, timeouts count as unsuccessful requests
+            try:
+                r = self.get(url, stream=stream)
+            except requests.ConnectionError as e:
+                if last:
+                    _report(url, None, 0, started, attempt, None)
+                    raise AssertionError("Error - HTTP request was unsuccessful.") from e
+                self.limiter.throttled()
+                self._backoff(attempt)
+                continue
+            except requests.RequestException as e:
+                _report(url, None, 0, started, attempt, None)
+                raise AssertionError("Error - HTTP request was unsuccessful.") from e
+            
+            #slow down and retry if the server is throttling (429) or failing (5xx)
+            if (r.status_code==429 or r.status_code>=500) and not last:
+                r.close()
+                self.limiter.throttled()
+                self._backoff(attempt, r.headers.get('Retry-After'))
+                continue
+            
+            #assert the response was 200 (OK)
+            if r.status_code!=200:
+                r.close()
+                _report(url, r.status_code, 0, started, attempt, None)
+                raise AssertionError("Error - HTTP request was unsuccessful.")
+            self.limiter.succeeded()
+            
+            #the caller reports the response once its body is read
+            r.retries = attempt
+            return r
+    
+    def _garbled(self, url, attempt, error):
+        
+        """ Handles a response that was not valid JSON: drops it from the cache, slows down, then retries or fails """
+        
+        from imfpy import cache
+        
+        disk = cache.get_cache()
+        if disk is not None:
+            disk.delete(url)
+        if attempt == self.retries:
+            raise AssertionError("Error - the response was not valid JSON. Please try again.") from error
+        self.limiter.throttled()
+        self._backoff(attempt)
+    
+    def get_content(self, url, fresh=False):
+        
+        """
+        Returns the raw body (bytes) of the response to a get request.
+        Responses are served from and stored to the on-disk cache when it is enabled,
+        unless fresh is True, in which case the cache is not read.
+        """
+        
+        return self._flights.do(('content', url, fresh), lambda: self._get_content(url, fresh))
+    
+    def _get_content(self, url, fresh):
+        
+        from imfpy import cache
+        
+        disk = cache.get_cache()
+        started = time.perf_counter()
+        if disk is not None and not fresh:
+            content = disk.get(url)
+            if content is not None:
+                _report(url, 200, len(content), started, 0, 'hit')
+                return content
+        
+        r = self._send(url)
+        content = r.content
+        _report(url, r.status_code, len(content), started, r.retries, None if disk is None else 'miss')
+        
+        if disk is not None:
+            disk.set(url, content)
+        return content
+    
+    def get_json(self, url):
+        
+        """
+        Sends a get request to the API and returns the decoded JSON.
+        Responses are served from and stored to the on-disk cache when it is enabled.
+        
+        Parameters
+        ----------
+        url : str
+            The full request URL.
+            
+        Returns
+        -------
+        data_json : dict
+            The subscriptable JSON response.
+        
+        """
+        
+        return self._flights.do(('json', url), lambda: self._get_json(url))
+    
+    def _get_json(self, url):
+        
+        #convert the data to subscriptable json, retrying broken responses
+        for attempt in range(self.retries + 1):
+            content = self.get_content(url, fresh=attempt > 0)
+            try:
+                return loads(content)
+            except ValueError as e:
+                self._garbled(url, attempt, e)
+    
+    def iter_items(self, url, path):
+        
+        """
+        Sends a get request to the API and yields the elements found at a path in the JSON, one at a time.
+        By default the response is decoded as a whole with the JSON backend.
+        If streaming is on (see stream) it is parsed incrementally with ijson as it is read,
+        so the full JSON tree is never held in memory.
+        
+        Parameters
+        ----------
+        url : str
+            The full request URL.
+        path : str
+            Dot-separated keys leading to a list (or single element), such as 'CompactData.DataSet.Series'
+        
+        Yields
+        ------
+        item : dict
+            Each element of the list at path. Nothing is yielded if path is not in the response.
+        
+        """
+        
+        import io
+        from imfpy import cache, sdmx
+        
+        ijson = None
+        if self.stream:
+            try:
+                import ijson
+            except ImportError:
+                pass
+        if ijson is None:
+            yield from sdmx.walk(self.get_json(url), path)
+            return
+        
+        for attempt in range(self.retries + 1):
+            
+            #responses that are cached (or about to be), retried, or already being streamed
+            #by another thread are parsed from memory
+            #otherwise parse the response straight off the socket, keeping a copy of the body only if
+            #another thread asks for the same url before it is read (later threads send their own request)
+            r, call = None, None
+            if cache.get_cache() is None and attempt == 0:
+                call, leader = self._flights.join(('content', url, False))
+                if not leader:
+                    with self._lock:
+                        streaming = self._streams.get(url)
+                    if streaming is not None:
+                        streaming.keep()
+                    source = io.BytesIO(self._flights.wait(call, lambda: self.get_content(url)))
+                    call = None
+                else:
+                    source = _Recorder()
+                    with self._lock:
+                        self._streams[url] = source
+                    started = time.perf_counter()
+                    try:
+                        r = self._send(url, stream=True)
+                    except BaseException:
+                        self._unregister(url, source)
+                        self._flights.finish(call)
+                        raise
+                    r.raw.decode_content = True
+                    source.raw = r.raw
+            else:
+                source = io.BytesIO(self.get_content(url, fresh=attempt > 0))
+            
+            #broken responses are retried, as long as nothing was yielded from them yet
+            yielded = False
+            try:
+                for item in sdmx.iter_path(source, path):
+                    yielded = True
+                    yield item
+                if call is not None and source.chunks is not None:
+                    self._flights.finish(call, source.getvalue(), ok=True)
+                return
+            except (ValueError, ijson.JSONError) as e:
+                if yielded:
+                    raise AssertionError("Error - the response was not valid JSON. Please try again.") from e
+                self._garbled(url, attempt, e)
+            finally:
+                if call is not None:
+                    self._unregister(url, source)
+                    if not call.event.is_set():
+                        self._flights.finish(call)
+                if r is not None:
+                    r.close()
+                    _report(url, r.status_code, source.size(), started, r.retries, None)
+    
+    def _unregister(self, url, source):
+        with self._lock:
+            if self._streams.get(url) is source:
+                del self._streams[url]
+    
+    def close(self):
+        
+        """ Closes the pooled connections """
+        
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+def get_transport():
+    
+    """ Returns the Transport shared by retrievals and searches, creating it on first use """
+    
+    global _transport
+    
+    if _transport is None:
+        with _lock:
+            if _transport is None:
+                _transport = Transport()
+    return _transport
+
+def set_transport(new_transport):
+    
+    """
+    Replaces the Transport shared by retrievals and searches,
+    and empties the series cached by dots, which came through the old one.
+    
+    Parameters
+    ----------
+    new_transport : Transport
+        The transport to send every request through.
+    
+    Examples
+    --------
+    >>> transport.set_transport(transport.Transport(timeout=5))
+    Fails requests that take longer than 5 seconds.
+    
+    """
+    
+    assert isinstance(new_transport, Transport), "new_transport must be a Transport"
+    
+    global _transport
+    
+    with _lock:
+        old, _transport = _transport, new_transport
+    if old is not None and old is not new_transport:
+        old.close()
+        #only clear the series cache if dots has been imported (and so may have cached some)
+        retrievals = sys.modules.get('imfpy.retrievals')
+        if retrievals is not None:
+            retrievals.clear_cache()
+
+def get_json(url):
+    
+    """
+    Sends a get request to the IMF JSON RESTful API through the shared Transport
+    and returns the decoded JSON.
+    
+    Parameters
+    ----------
+    url : str
+        The full request URL.
+        
+    Returns
+    -------
+    data_json : dict
+        The subscriptable JSON response.
+    
+    """
+    
+    return get_transport().get_json(url)
+
+def iter_items(url, path):
+    
+    """
+    Sends a get request to the IMF JSON RESTful API through the shared Transport
+    and yields the elements at path in the JSON response (see Transport.iter_items).
+    
+    Parameters
+    ----------
+    url : str
+        The full request URL.
+    path : str
+        Dot-separated keys leading to a list, such as 'CompactData.DataSet.Series'
+    
+    """
+    
+    return get_transport().iter_items(url, path)
@@ -1,14 +1,17 @@
-import pytest, time
+import pytest
 import pandas as pd
 from imfpy.retrievals import dots
 from imfpy import searches
 
-#need to wait between tests or else the json decoder will break down
-@pytest.fixture(autouse=True)
-def slow_down_tests():
-    """ Enforcing wait period between tests to allow the json decoder to reset """
-    yield
-    time.sleep(10)
+#the API returns broken JSON when pushed too hard, so rather than waiting between tests
+#every request goes through one transport kept under the published limit, retrying what still breaks
+@pytest.fixture(scope='module', autouse=True)
+def rate_limited():
+    """ Sending every request of the tests through one rate-limited transport """
+    from imfpy import fixtures, transport
+    limiter = transport.RateLimiter(rate=1.0, burst=5, max_rate=2.0)
+    with fixtures._using(transport.Transport(limiter=limiter, retries=5)):
+        yield
 
 def test_dots_simple():
     """ Testing if retrievals.dots works on a simple case """
@@ -64,6 +67,31 @@ def test_country_searches():
     assert searches.country_search("Br").shape==(3, 2)
     assert searches.country_search("^A.*a$",regex=True).size==24
 
+def test_country_search_many():
+    """ Testing if searches.country_search_many matches country_search keyword by keyword """
+    keywords = ["Br", "germany", "Br", "christmas"]
+    many = searches.country_search_many(keywords)
+    for keyword in set(keywords):
+        single = searches.country_search(keyword)
+        assert list(many[many.Keyword==keyword]['Country Code'].unique())==list(single['Country Code'])
+
+def test_country_resolve():
+    """ Testing if searches.country_resolve ranks near-misses to the right codes """
+    resolved = searches.country_resolve(["Untied States", "Germnay", "christmas"])
+    assert list(resolved['Country Code'][:2])==["US", "DE"]
+    assert resolved['Country Code'].isna().iloc[2]
+    with pytest.raises(AssertionError):
+        searches.country_resolve(["Germany"], cutoff=101)
+
+def test_snapshot(tmp_path, monkeypatch):
+    """ Testing if the codelist snapshot reproduces the live country and database codes """
+    from imfpy import snapshot
+    monkeypatch.setenv('IMFPY_CACHE_DIR', str(tmp_path))
+    snapshot.build()
+    monkeypatch.setattr(snapshot, '_loaded', None)
+    pd.testing.assert_frame_equal(snapshot.frame('countries'), searches._fetch_country_codes())
+    pd.testing.assert_frame_equal(snapshot.frame('databases'), searches._fetch_database_codes())
+
 def test_database_searches():
     """ Testing if searches.database_searches behaves correctly """
     assert searches.database_codes().shape == (260,2)
@@ -76,6 +104,24 @@ def test_database_dimensions():
     with pytest.raises(AssertionError):
         searches.database_dimensions('BOPS')
 
+def test_data_structure():
+    """ Testing if searches.data_structure is parsed once and shared by the other searches """
+    structure = searches.data_structure('BOP')
+    assert searches.data_structure('BOP') is structure
+    assert 'CL_INDICATOR_BOP' in structure.codelists
+    assert len(structure.dimensions)==searches.database_dimensions('BOP').shape[0]
+    assert len(structure.codelists['CL_INDICATOR_BOP'])==searches.indicator_dimensions('CL_INDICATOR_BOP').shape[0]
+
+def test_catalog(tmp_path):
+    """ Testing if a catalog built offline answers searches like the live functions """
+    from imfpy import catalog
+    path = str(tmp_path / "catalog.sqlite")
+    summary = catalog.build(path, databases=['DOT'])
+    assert summary['databases']==1 and not summary['failed']
+    match = searches.catalog_search("exports", database_id='DOT', path=path)
+    assert 'TXG_FOB_USD' in match['Series ID'].values
+    pd.testing.assert_frame_equal(searches.catalog_dimensions('DOT', path=path), searches.database_dimensions('DOT'))
+
 def test_indicator_dimensions():
     """ Testing if searches.indicator_dimensions behaves correctly """
     assert searches.indicator_dimensions('CL_INDICATOR_FAS').shape==(205,3)
@@ -87,4 +133,79 @@ def test_integration():
      c = searches.country_search("Bah").reset_index(drop=True)
      c = list(c['Country Code'])
      d = dots("IT", c, 1990, 2000, "M", "long")
-     assert isinstance(d, pd.DataFrame)
\ No newline at end of file
+     assert isinstance(d, pd.DataFrame)
+
+def test_dots_concurrent():
+     """ Testing if concurrent retrievals.dots matches sequential retrieval """
+     #yearly chunks split the window into three requests, sent at once with max_workers=4
+     counterparts = ["US", "JP", "DE", "FR"]
+     concurrent = dots("CN", counterparts, 2010, 2012, "M", "wide", max_workers=4, chunk_years=1, cache=False)
+     sequential = dots("CN", counterparts, 2010, 2012, "M", "wide", max_workers=1, chunk_years=1, cache=False)
+     pd.testing.assert_frame_equal(concurrent, sequential)
+
+def test_dots_coalesced():
+     """ Testing if identical retrievals.dots calls from several threads return the same data """
+     from concurrent.futures import ThreadPoolExecutor
+     with ThreadPoolExecutor(max_workers=4) as executor:
+         frames = list(executor.map(lambda _: dots("GB", ["US", "FR"], 2005, 2010, cache=False), range(4)))
+     for frame in frames[1:]:
+         pd.testing.assert_frame_equal(frame, frames[0])
+
+def test_dots_chunks():
+     """ Testing if chunked monthly retrieval matches a single request """
+     chunked = dots("US", ["CN", "MX"], 1995.03, 2020.09, "M", "long", chunk_years=5)
+     whole = dots("US", ["CN", "MX"], 1995.03, 2020.09, "M", "long", chunk_years=None)
+     pd.testing.assert_frame_equal(chunked, whole)
+
+def test_dots_range_cache():
+     """ Testing if series kept in memory serve narrower and wider windows correctly """
+     from imfpy.retrievals import clear_cache
+     clear_cache()
+     dots("US", "CN", 1995, 2010)
+     for start, end in [(2000, 2005), (1990, 2015)]:
+         pd.testing.assert_frame_equal(dots("US", "CN", start, end), dots("US", "CN", start, end, cache=False))
+
+def test_refresh():
+     """ Testing if retrievals.refresh brings older data up to date """
+     from imfpy.retrievals import refresh
+     old = dots("US", ["CN", "MX"], 2010, 2015, "M", "wide", cache=False)
+     new = refresh(old, end=2018)
+     pd.testing.assert_frame_equal(new, dots("US", ["CN", "MX"], 2010, 2018, "M", "wide", cache=False))
+
+def test_trade_matrix():
+     """ Testing if retrievals.trade_matrix matches dots for each pair """
+     from imfpy.retrievals import trade_matrix
+     m = trade_matrix(["US", "CN"], ["JP", "DE", "MX"], 2000, 2010)
+     assert m.values.shape == (2, 3, 11, 3)
+     d = dots("CN", ["JP", "DE", "MX"], 2000, 2010, "A", "wide", cache=False)
+     assert (m.values[1, 0, :, 0] == d[("Exports", "JP")].values).all()
+
+def test_store(tmp_path):
+     """ Testing if store.DotsStore answers dots queries from disk """
+     pytest.importorskip("pyarrow")
+     from imfpy.store import DotsStore
+     store = DotsStore(str(tmp_path))
+     store.write(dots("AU", ["US", "CN"], 2000, 2010, "M", "long"))
+     pd.testing.assert_frame_equal(store.read("AU", ["US", "CN"], 2002, 2005.06, "M", "wide"),
+                                   dots("AU", ["US", "CN"], 2002, 2005.06, "M", "wide"))
+
+def test_async():
+     """ Testing if the awaitable functions return the same results as the blocking ones """
+     import asyncio
+     from imfpy.retrievals import adots
+     async def gather():
+         return await asyncio.gather(adots("CN", "MX", 1990, 2015), searches.acountry_search("Br"))
+     d, c = asyncio.run(gather())
+     pd.testing.assert_frame_equal(d, dots("CN", "MX", 1990, 2015))
+     assert c.shape==(3, 2)
+
+def test_cache(tmp_path):
+     """ Testing if the on-disk cache serves repeated requests """
+     from imfpy import cache
+     disk = cache.enable(str(tmp_path))
+     try:
+         first = dots("CN", "MX", 1990, 2015, cache=False)
+         assert disk.size() > 0
+         pd.testing.assert_frame_equal(dots("CN", "MX", 1990, 2015, cache=False), first)
+     finally:
+         cache.disable()
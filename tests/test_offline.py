@@ -0,0 +1,355 @@
+import json, zlib
+from contextlib import contextmanager
+import pytest
+import pandas as pd
+from urllib.parse import urlparse, parse_qs
+from imfpy import fixtures, retrievals, searches, snapshot, transport
+from imfpy.server import SDMXServer
+
+#these tests answer every request from fixtures they build, so they need neither the network nor the wait between tests
+
+def _value(*key):
+    return zlib.crc32(repr(key).encode()) % 100000 / 8
+
+def _compact(url, last=None):
+    """ Builds a CompactData response holding every series asked for (with data up to the year last), in the form of the IMF API """
+    query = urlparse(url)
+    freq, countries, indicators, counterparts = query.path.split('CompactData/DOT/')[1].split('.')
+    start, end = (int(parse_qs(query.query)[bound][0][:4]) for bound in ('startPeriod', 'endPeriod'))
+    years = range(start, min(end, last or end) + 1)
+    series = [{'@FREQ': freq, '@REF_AREA': country, '@INDICATOR': indicator, '@COUNTERPART_AREA': counterpart,
+               'Obs': [{'@TIME_PERIOD': str(year), '@OBS_VALUE': str(_value(country, indicator, counterpart, year))}
+                       for year in years]}
+              for country in countries.split('+') for counterpart in counterparts.split('+')
+              for indicator in indicators.split('+')]
+    #series without observations in the window are left out, like the IMF API does
+    return {'CompactData': {'DataSet': {'Series': series} if years else {}}}
+
+def _structure():
+    codes = lambda items: [{'@value': code, 'Description': {'#text': name}} for code, name in items]
+    areas = [('US', 'United States'), ('GB', 'United Kingdom'), ('FR', 'France'), ('CI', "Côte d'Ivoire")]
+    return {'Structure': {'CodeLists': {'CodeList': [
+                {'@id': 'CL_FREQ', 'Code': codes([('A', 'Annual'), ('M', 'Monthly')])},
+                {'@id': 'CL_AREA_DOT', 'Code': codes(areas)}]},
+            'KeyFamilies': {'KeyFamily': {'@id': 'DOT', 'Components': {'Dimension': [
+                {'@conceptRef': 'FREQ', '@codelist': 'CL_FREQ'},
+                {'@conceptRef': 'REF_AREA', '@codelist': 'CL_AREA_DOT'},
+                {'@conceptRef': 'COUNTERPART_AREA', '@codelist': 'CL_AREA_DOT'}]}}}}}
+
+def _dataflow():
+    return {'Structure': {'Dataflows': {'Dataflow': [
+        {'@id': f'DS-{database}', 'KeyFamilyRef': {'KeyFamilyID': database}, 'Name': {'#text': name}}
+        for database, name in [('DOT', 'Direction of Trade Statistics (DOTS)'), ('IFS', 'International Financial Statistics (IFS)')]]}}}
+
+class _Upstream(transport.Transport):
+    """ Stands in for the IMF API behind the recording transport """
+    last = None
+    def get(self, url, stream=False):
+        path = fixtures.FixtureStore.key(url)
+        data = _dataflow() if path == 'Dataflow' else _structure() if path.startswith('DataStructure/') else _compact(url, self.last)
+        return fixtures.Replayed(url, json.dumps(data).encode('utf-8'))
+
+class _Recording(fixtures.RecordingTransport, _Upstream):
+    pass
+
+def _fast_limiter():
+    return transport.RateLimiter(rate=1000, burst=100, min_rate=100, max_rate=1000)
+
+def _serve(path, calls, last=None, **kwargs):
+    """ Records the responses a list of calls need from the stand-in API (with data up to the year last), then serves them """
+    recorder = _Recording(path, limiter=_fast_limiter())
+    recorder.last = last
+    with fixtures._using(recorder):
+        for call in calls:
+            try:
+                call()
+            except AssertionError:
+                pass
+    retrievals.clear_cache()
+    return SDMXServer(path, **kwargs)
+
+@contextmanager
+def _served(local, **kwargs):
+    """ Sends every request inside it to a running local server, through a fresh transport """
+    with local, fixtures._using(transport.Transport(limiter=_fast_limiter(), **kwargs)):
+        transport.set_base_url(local.url)
+        yield local
+
+@pytest.fixture
+def offline(tmp_path, monkeypatch):
+    """ Records a few responses from the stand-in API to fixtures, and cleans up every cache around the test """
+    monkeypatch.setattr(snapshot, '_enabled', False)
+    searches.clear_cache()
+    retrievals.clear_cache()
+    with fixtures._using(_Recording(str(tmp_path), limiter=_fast_limiter())):
+        recorded = (retrievals.dots('US', ['GB', 'FR'], 2000, 2005, max_workers=1),
+                    searches.country_search('kingdom'), searches.database_search('trade'))
+    searches.clear_cache()
+    retrievals.clear_cache()
+    yield str(tmp_path), recorded
+    transport.set_base_url()
+    searches.clear_cache()
+    retrievals.clear_cache()
+
+def _queries():
+    return (retrievals.dots('US', ['GB', 'FR'], 2000, 2005, max_workers=1),
+            searches.country_search('kingdom'), searches.database_search('trade'))
+
+def test_record_replay(offline):
+    """ Testing if replayed fixtures give the same results as the recorded responses """
+    path, recorded = offline
+    assert 'Dataflow' in fixtures.FixtureStore(path).keys(), "Fails to record responses"
+    with fixtures.replay(path):
+        replayed = _queries()
+    for expected, actual in zip(recorded, replayed):
+        pd.testing.assert_frame_equal(expected, actual)
+    with fixtures.replay(path), pytest.raises(AssertionError):
+        retrievals.dots('US', ['GB', 'FR'], 1990, 1995, cache=False)
+
+def test_server(offline):
+    """ Testing if retrievals and searches work against the local server through the base URL """
+    path, recorded = offline
+    with SDMXServer(path) as local, fixtures._using(transport.Transport(limiter=_fast_limiter())):
+        transport.set_base_url(local.url + '/')
+        assert transport.base_url()==local.url, "Fails to strip the trailing slash"
+        served = _queries()
+        with pytest.raises(AssertionError):
+            retrievals.dots('US', ['GB', 'FR'], 1990, 1995, cache=False)
+    for expected, actual in zip(recorded, served):
+        pd.testing.assert_frame_equal(expected, actual)
+    assert local.counts[200]==3 and local.counts[400]==1, "Unexpected requests"
+
+def test_server_faults(offline):
+    """ Testing if requests are retried through throttling, server errors and broken responses, while streaming them """
+    path, recorded = offline
+    local = SDMXServer(path, rate=5, burst=1, error_rate=0.15, garble_rate=0.1, retry_after=0.01, seed=4)
+    with local, fixtures._using(transport.Transport(limiter=_fast_limiter(), retries=5, stream=True)):
+        transport.set_base_url(local.url)
+        served = _queries()
+    for expected, actual in zip(recorded, served):
+        pd.testing.assert_frame_equal(expected, actual)
+    assert local.counts[429] and local.counts[503] and local.counts['garbled'], "Faults not exercised"
+
+def test_retry_after(monkeypatch):
+    """ Testing if malformed Retry-After headers fall back to the backoff, and if waits stay within [0, MAX_BACKOFF] """
+    slept = []
+    monkeypatch.setattr(transport.time, 'sleep', slept.append)
+    headers = ['2', '-1', '1e9', 'nan', 'inf', '-inf', 'soon', 'Wed, 21 Oct 2015 07:28:00 GMT', None]
+    for header in headers:
+        transport.Transport()._backoff(0, header)
+    assert slept[:3]==[2.0, 0.0, transport.MAX_BACKOFF], "Retry-After seconds not honoured within bounds"
+    assert all(transport.BACKOFF * 0.5 <= delay <= transport.BACKOFF * 1.5 for delay in slept[3:]), "Malformed Retry-After not backed off"
+
+def test_events(offline):
+    """ Testing if requests and dots stages emit events, and if metrics aggregate and export them """
+    from imfpy import events
+    path, recorded = offline
+    local = SDMXServer(path, error_rate=0.15, garble_rate=0.1, retry_after=0.01, seed=4)
+    seen = []
+    with local, fixtures._using(transport.Transport(limiter=_fast_limiter(), retries=5)), events.collect() as metrics:
+        transport.set_base_url(local.url)
+        events.subscribe(seen.append)
+        try:
+            _queries()
+        finally:
+            events.unsubscribe(seen.append)
+    http = [event for event in seen if isinstance(event, events.HTTPEvent)]
+    assert len(http)==local.counts[200] and {event.endpoint for event in http}=={'CompactData', 'DataStructure', 'Dataflow'}, "Missing HTTP events"
+    assert sum(event.retries for event in http)==metrics.retries==local.counts[503], "Retries not counted"
+    assert [event.stage for event in seen if isinstance(event, events.StageEvent)]==['decode', 'build', 'build', 'combine', 'pivot'], "Missing stage events"
+    assert metrics.to_dict()['stages']['build']['count']==2, "Stages not aggregated"
+    assert 'imfpy_stage_seconds_count{stage="pivot"} 1' in metrics.to_prometheus(), "Fails to export Prometheus text"
+    with fixtures.replay(path), events.collect() as metrics:
+        retrievals.dots('US', ['GB', 'FR'], 2000, 2005)
+        retrievals.dots('US', ['GB', 'FR'], 2001, 2004)
+        retrievals.dots('US', ['GB', 'FR'], 2000, 2005, cache=False)
+    assert metrics.to_dict()['cache']==[{'cache': 'series', 'result': 'hit', 'count': 2},
+                                        {'cache': 'series', 'result': 'miss', 'count': 2}], "Series cache lookups not counted"
+    assert metrics.requests=={('CompactData', '200'): 2}, "Cached series requested again"
+
+def test_profile(offline):
+    """ Testing if dots records stage timings and memory into attrs, and if they print as a report """
+    from imfpy import profiling
+    path, recorded = offline
+    with fixtures.replay(path):
+        actual = retrievals.dots('US', ['GB', 'FR'], 2000, 2005, max_workers=1, profile=True)
+        unprofiled = retrievals.dots('US', ['GB', 'FR'], 2000, 2005)
+    pd.testing.assert_frame_equal(recorded[0], actual)
+    profile = profiling.Profile.from_dict(actual.attrs['profile'])
+    assert set(profile.stages().index)=={'request', 'decode', 'build', 'combine', 'pivot'}, "Missing stages"
+    assert profile.peak > 0 and all(record['cpu'] is not None for record in profile.records if record['stage']!='request'), "Missing CPU or memory"
+    assert list(profile.counterparts().index.sort_values())==['FR', 'GB'], "Missing counterparts"
+    assert profiling.report(actual).startswith("Profile:"), "Fails to print a report"
+    assert 'profile' not in unprofiled.attrs, "Profiles without profile=True"
+
+def test_dots_batches(offline):
+    """ Testing if counterparts beyond BATCH_SIZE are split across requests and give the same frame as one request each """
+    path, _ = offline
+    counterparts = [f'C{i:03d}' for i in range(150)]
+    batched = lambda: retrievals.dots('US', counterparts, 2000, 2005, form='long', cache=False)
+    single = lambda: [retrievals.dots('US', counterpart, 2000, 2005, cache=False) for counterpart in counterparts]
+    with _served(_serve(path, [batched, single])) as local:
+        actual = batched()
+        assert local.counts['requests']==3, "Counterparts not batched by BATCH_SIZE"
+        frames = single()
+    expected = pd.concat(frame[['Period', 'Country', 'Counterpart', 'Exports', 'Imports', 'Trade Balance', 'Twoway Trade']]
+                         for frame in frames)
+    pd.testing.assert_frame_equal(actual, expected[actual.columns])
+
+def test_cache_entries(tmp_path):
+    """ Testing if broken cache entries count as missing, and if the cache is evicted to max_size """
+    import os
+    from imfpy import cache
+    disk = cache.DiskCache(str(tmp_path), max_size=2500)
+    url = 'http://example.org/CompactData/DOT/A.US.TXG_FOB_USD.GB'
+    disk.set(url, b'{}')
+    file = disk._file(url)
+    with open(file, 'r+b') as f:
+        f.truncate(len(f.read()) - 4)
+    assert disk.get(url) is None and not os.path.exists(file), "Broken entry not dropped"
+    for i in range(10):
+        disk.set(f'{url}+C{i}', os.urandom(1000))
+    assert 0 < disk.size() <= 2500 and disk.get(f'{url}+C9') is not None, "Cache not evicted to max_size"
+
+def test_cache_opt_in(tmp_path, monkeypatch):
+    """ Testing if the response cache is turned on by IMFPY_RESPONSE_CACHE only, not by choosing a cache directory """
+    import subprocess, sys
+    monkeypatch.setenv('IMFPY_CACHE_DIR', str(tmp_path))
+    monkeypatch.delenv('IMFPY_RESPONSE_CACHE', raising=False)
+    enabled = lambda: subprocess.run([sys.executable, '-c', 'from imfpy import cache; print(cache.get_cache() is not None)'],
+                                     capture_output=True, text=True, check=True).stdout.strip()
+    assert enabled()=='False', "Response cache turned on by IMFPY_CACHE_DIR"
+    monkeypatch.setenv('IMFPY_RESPONSE_CACHE', '1')
+    assert enabled()=='True', "Response cache not turned on by IMFPY_RESPONSE_CACHE"
+
+def test_dots_cache_edges(offline):
+    """ Testing if cached calls request the periods after the last observation again, like calls without the cache """
+    path, _ = offline
+    call = lambda start, end, cache=True: retrievals.dots('US', ['GB', 'FR'], start, end, cache=cache)
+    recorded = [lambda: call(2015, 2020, False), lambda: call(2019, 2020, False), lambda: call(2016, 2018, False)]
+    with _served(_serve(path, recorded, last=2018)) as local:
+        pd.testing.assert_frame_equal(call(2015, 2020), call(2015, 2020, False))
+        sent = local.counts['requests']
+        pd.testing.assert_frame_equal(call(2016, 2018), call(2016, 2018, False))
+        assert local.counts['requests']==sent + 1, "Cached periods requested again"
+        for cache in (False, True):
+            with pytest.raises(AssertionError):
+                call(2019, 2020, cache)
+        assert local.counts['requests']==sent + 3, "Periods after the last observation not requested again"
+
+def test_dots_cache_servers(offline, tmp_path):
+    """ Testing if series cached from one server are not served after pointing requests at another, or replacing the transport """
+    path, recorded = offline
+    call = lambda: retrievals.dots('US', ['GB', 'FR'], 2000, 2005, max_workers=1)
+    with _served(SDMXServer(path)), _serve(str(tmp_path / 'other'), [call], last=2003) as other:
+        pd.testing.assert_frame_equal(call(), recorded[0])
+        transport.set_base_url(other.url)
+        shorter = call()
+        assert other.counts['requests']==1 and len(shorter) < len(recorded[0]), "Series served from the previous server"
+        with fixtures._using(transport.Transport(limiter=_fast_limiter())):
+            pd.testing.assert_frame_equal(call(), shorter)
+        assert other.counts['requests']==2, "Series served through the previous transport"
+
+def test_refresh(offline):
+    """ Testing if refresh leaves data unchanged when nothing was published after the last period held """
+    path, _ = offline
+    held = lambda: retrievals.dots('US', ['GB', 'FR'], 2010, 2018, cache=False)
+    refreshes = [lambda data: retrievals.refresh(data, revisions=0, end=2020), lambda data: retrievals.refresh(data, end=2020)]
+    with _served(_serve(path, [lambda: [refresh(held()) for refresh in refreshes]], last=2018)) as local:
+        data = held()
+        for refresh in refreshes:
+            sent = local.counts['requests']
+            pd.testing.assert_frame_equal(refresh(data), data)
+            assert local.counts['requests']==sent + 1, "Newer periods not requested"
+
+def test_trade_matrix_window(offline):
+    """ Testing if trade_matrix validates and reads start/end dates like dots """
+    path, _ = offline
+    calls = [lambda: retrievals.dots('US', ['GB', 'FR'], 2000, 2004.06, cache=False),
+             lambda: retrievals.trade_matrix(['US'], ['GB', 'FR'], 2000, 2004.06)]
+    with _served(_serve(path, calls)):
+        expected, matrix = (call() for call in calls)
+    assert list(matrix.periods)==list(expected.index), "Periods differ from dots"
+    assert (matrix.values[0, 1, :, 0]==expected[('Exports', 'FR')].values).all(), "Values differ from dots"
+    for start, end, freq in [(2005, 2000, 'A'), (2000.13, 2004, 'M'), (1700, 2004, 'A')]:
+        with pytest.raises(AssertionError):
+            retrievals.trade_matrix(['US'], ['GB', 'FR'], start, end, freq)
+
+def test_store_window(offline, tmp_path):
+    """ Testing if DotsStore.read reads an annual end with months like dots, skipping temporary files """
+    import os
+    pytest.importorskip('pyarrow')
+    from imfpy.store import DotsStore
+    path, _ = offline
+    calls = [lambda: retrievals.dots('US', ['GB', 'FR'], 2000, 2010, form='long', cache=False),
+             lambda: retrievals.dots('US', ['GB', 'FR'], 2002, 2005.06, cache=False)]
+    with _served(_serve(path, calls)):
+        data, expected = (call() for call in calls)
+    store = DotsStore(str(tmp_path / 'store'))
+    store.write(data)
+    #a temporary file left behind by a crashed write is skipped
+    with open(os.path.join(os.path.dirname(store._file('A', 'US', 'GB')), '.part-0.parquet.1.tmp'), 'wb') as file:
+        file.write(b'PAR1')
+    pd.testing.assert_frame_equal(store.read('US', ['GB', 'FR'], 2002, 2005.06), expected)
+
+def test_snapshot(offline, tmp_path, monkeypatch):
+    """ Testing if searches save a snapshot only where asked, and answer from it later without the network """
+    import os
+    path, recorded = offline
+    monkeypatch.setattr(snapshot, '_enabled', True)
+    monkeypatch.setattr(snapshot, '_loaded', None)
+    monkeypatch.delenv('IMFPY_CACHE_DIR', raising=False)
+    monkeypatch.setenv('HOME', str(tmp_path / 'home'))
+    with _served(SDMXServer(path)) as local:
+        searches.country_search('kingdom')
+        assert snapshot.user_path() is None and snapshot.load() is None, "Snapshot saved without a cache directory"
+        monkeypatch.setenv('IMFPY_CACHE_DIR', str(tmp_path / 'cache'))
+        monkeypatch.setattr(snapshot, '_loaded', None)
+        searches.clear_cache()
+        requests = local.counts['requests']
+        searches.country_search('kingdom')
+        assert local.counts['requests']==requests + 2, "Codelists not requested once each"
+        os.remove(snapshot.user_path())
+        snapshot.refresh().join()
+    assert not os.path.exists(tmp_path / 'home') and os.path.exists(snapshot.user_path()), "Snapshot saved to the wrong place"
+    monkeypatch.setattr(snapshot, '_loaded', None)
+    searches.clear_cache()
+    with fixtures.replay(str(tmp_path / 'nothing')):
+        pd.testing.assert_frame_equal(searches.country_search('kingdom'), recorded[1])
+        pd.testing.assert_frame_equal(searches.database_search('trade'), recorded[2])
+
+def test_stream_coalesced(offline, monkeypatch):
+    """ Testing if a streamed response is shared with threads asking for it at the same moment, and copied for nobody else """
+    from concurrent.futures import ThreadPoolExecutor
+    path, _ = offline
+    recorders = []
+    class _Spy(transport._Recorder):
+        def __init__(self, *args):
+            super().__init__(*args)
+            recorders.append(self)
+    monkeypatch.setattr(transport, '_Recorder', _Spy)
+    key = next(key for key in fixtures.FixtureStore(path).keys() if key.startswith('CompactData'))
+    with _served(SDMXServer(path, latency=0.2), stream=True) as local:
+        iterate = lambda _: list(transport.iter_items(f'{local.url}/{key}', 'CompactData.DataSet.Series'))
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(iterate, range(4)))
+        assert local.counts['requests']==1 and all(result==results[0] for result in results), "Response not shared"
+        assert iterate(0)==results[0] and recorders[-1].chunks is None, "Response copied without followers"
+
+def test_catalog_limit(offline, tmp_path):
+    """ Testing if catalog searches return at most limit rows when a codelist is used by several databases """
+    from imfpy import catalog
+    path, _ = offline
+    with fixtures._using(_Recording(path, limiter=_fast_limiter())):
+        catalog.build(str(tmp_path / 'catalog.sqlite'), databases=['DOT', 'IFS'])
+    found = catalog.Catalog(str(tmp_path / 'catalog.sqlite'))
+    assert list(found.search('kingdom')['Database ID'])==['DOT', 'IFS'], "Codes not listed per database"
+    assert len(found.search('kingdom', limit=1))==1, "More rows than limit"
+
+def test_import():
+    """ Testing if importing imfpy and its searches, retrievals and tools modules leaves heavy dependencies unloaded """
+    import subprocess, sys
+    script = ("import sys; import imfpy, imfpy.searches, imfpy.retrievals, imfpy.tools; "
+              "print(' '.join(name for name in ('pandas', 'numpy', 'requests', 'matplotlib') if name in sys.modules))")
+    loaded = subprocess.run([sys.executable, '-c', script], capture_output=True, check=True, text=True).stdout.split()
+    assert loaded==[], f"Heavy dependencies imported eagerly: {loaded}"